@@ -1,66 +1,195 @@
 #!/usr/bin/env python3
 # app.py
 
+import hashlib
 import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import astuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
+
+import metrics
+import sqlitestore
+from changefeed import CHANGES_FILE, DIGESTS_FILE, ChangeFeed, ChangeSet, ChangeWatcher
+from columnar import COLUMNAR_FILE, WebinarRecord, load_records
+from datafile import current_data_file, iter_records
+from httpcache import CachedBody, cached_response, htmlsafe_json, version_tag
+from metrics import timed
+from query import (
+    MAX_LIMIT,
+    SORT_MODES,
+    STATE_SORT_MODES,
+    CatalogView,
+    WebinarQuery,
+    parse_query_args,
+)
+from search_index import SearchIndex, load_search_index
+from statestore import (
+    DEFAULT_USER,
+    STATE_FLAGS,
+    FileLock,
+    StateStore,
+    Update,
+    UserStateStores,
+    atomic_write_bytes,
+    atomic_write_json,
+    normalize_user,
+)
+
+# "json" (data.jsonl + state.json) or "sqlite" (see sqlitestore.py)
+STORAGE_BACKEND = os.environ.get("WEBINARHUNT_STORAGE", "json").lower()
+USE_SQLITE = STORAGE_BACKEND == "sqlite"
 
-DATA_FILE = "data.json"  # canonical webinar data
 STATE_FILE = "state.json"  # user state: watched/favorite keyed by webcastId
+STATE_JOURNAL_FILE = "state.journal.jsonl"  # pending deltas on top of STATE_FILE
+STATE_SHARD_DIR = "state"  # everyone else's: state/<user>.json + journal
+ID_INDEX_FILE = "id_index.json"  # objectID -> webcastId, written by fetch.py
+SEARCH_INDEX_FILE = "search_index.json"  # inverted index, written by fetch.py
+INDEX_SNAPSHOT_FILE = os.path.join("rendered", "index.html")  # pre-rendered /
+INDEX_SNAPSHOT_META_FILE = os.path.join("rendered", "index.json")  # its catalog version
+SORT_ORDERS_FILE = os.path.join("rendered", "orders.json")  # data-only sort orders, by fetch.py
+
+# /api/events: streams end after this long and the browser reconnects
+# (resuming from Last-Event-ID), so a worker thread is never held forever
+EVENT_STREAM_SECONDS = 300
+EVENT_KEEPALIVE_SECONDS = 15
+EVENT_RETRY_MS = 3000
+# An open stream holds its worker: "auto" only streams where that is one
+# thread (threaded WSGI servers such as gunicorn -k gthread, the dev
+# server, asgi.py), "1" always (e.g. gevent workers), "0" never. Without
+# a stream the page polls /api/changes.
+EVENTS_MODE = os.environ.get("WEBINARHUNT_EVENTS", "auto").lower()
+
+# Whose watched/favorite state a request uses: this header (set by an
+# authenticating proxy), else DEFAULT_USER (state.json). It partitions
+# state; it doesn't authenticate anyone. The cookie is only honoured with
+# WEBINARHUNT_USER_COOKIE=1: any client can pick any name with it, and
+# every name that toggles something gets a shard under state/.
+USER_HEADER = os.environ.get("WEBINARHUNT_USER_HEADER", "X-Forwarded-User")
+USER_COOKIE = "webinarhunt_user"
+TRUST_USER_COOKIE = os.environ.get("WEBINARHUNT_USER_COOKIE", "") not in ("", "0")
+
+
+class CatalogJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o: Any) -> Any:
+        # Records loaded from data.columns are read-only mappings
+        if isinstance(o, WebinarRecord):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 
 app = Flask(__name__)
+app.json = CatalogJSONProvider(app)
+
+state_stores = UserStateStores(StateStore(STATE_FILE, STATE_JOURNAL_FILE), STATE_SHARD_DIR)
+change_feed = ChangeFeed(CHANGES_FILE, DIGESTS_FILE)
+change_watcher = ChangeWatcher(change_feed)
 
 
 # ---------- Helpers for data + state ------------------
 
 
+def iter_data() -> Iterator[Dict[str, Any]]:
+    """
+    Canonical webinar records one at a time (data.jsonl, falling back to a
+    legacy data.json), e.g. for building indexes without keeping them all.
+    """
+    if USE_SQLITE:
+        return sqlitestore.iter_data()
+    return iter_records(current_data_file())
+
+
 def load_data() -> List[Dict[str, Any]]:
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        try:
-            payload = json.load(f)
-        except json.JSONDecodeError:
-            return []
-    return payload.get("webinars", [])
+    """
+    All records: mapped from data.columns when fetch.py wrote one for the
+    current data file (read-only WebinarRecords), else parsed from it.
+    """
+    with timed("load_data"):
+        if not USE_SQLITE:
+            records = load_records(COLUMNAR_FILE, current_data_file())
+            if records is not None:
+                return records  # type: ignore[return-value]
+        return list(iter_data())
 
 
-def load_state() -> Dict[str, Dict[str, Any]]:
+def load_state(user: str = DEFAULT_USER) -> Dict[str, Dict[str, Any]]:
     """
-    Returns:
+    One user's flags:
         {
           "<webcastId>": {"watched": bool, "favorite": bool},
           ...
         }
     """
-    if not os.path.exists(STATE_FILE):
-        return {}
+    with timed("load_state"):
+        if USE_SQLITE:
+            return sqlitestore.load_state(user=user)
+        # Snapshot (state.json or the user's shard) with the journal replayed on top
+        return state_stores.store(user).load()
 
-    with open(STATE_FILE, "r", encoding="utf-8") as f:
-        try:
-            state = json.load(f)
-        except json.JSONDecodeError:
-            return {}
 
-    # Backward compat: if file has top-level "webcast_state", unwrap it
-    if "webcast_state" in state and isinstance(state["webcast_state"], dict):
-        return state["webcast_state"]
+def save_state(state: Dict[str, Dict[str, Any]], user: str = DEFAULT_USER) -> None:
+    # Full rewrite (atomic); toggles should go through update_state instead
+    previous = load_state(user)
+    with timed("state_save"):
+        if USE_SQLITE:
+            sqlitestore.save_state(state, user=user)
+        else:
+            state_stores.writable_store(user).replace(state)
+    change_feed.record_state(sorted(set(previous) | set(state)))
+    if user == DEFAULT_USER:
+        index_snapshot.invalidate()
 
-    if isinstance(state, dict):
-        return state
 
-    return {}
+def update_state(updates: List[Update], user: str = DEFAULT_USER) -> None:
+    """
+    Record one user's flag changes as journal deltas, e.g.
+    [("12345", {"watched": True}), ("67890", {"favorite": False})]
+    """
+    with timed("state_save"):
+        if USE_SQLITE:
+            sqlitestore.update_state(updates, user=user)
+        else:
+            state_stores.writable_store(user).apply(updates)
+    change_feed.record_state(webcast_id for webcast_id, _ in updates)
+    if user == DEFAULT_USER:
+        index_snapshot.invalidate()
 
 
-def save_state(state: Dict[str, Dict[str, Any]]) -> None:
-    # Simple flat mapping keyed by webcastId
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2, ensure_ascii=False)
+def load_id_index() -> Optional[Dict[str, str]]:
+    """
+    objectID -> webcastId index produced by fetch.py. Returns None when the
+    file is missing or unreadable so callers can fall back to the data file.
+    """
+    if not os.path.exists(ID_INDEX_FILE):
+        return None
+    with open(ID_INDEX_FILE, "r", encoding="utf-8") as f:
+        try:
+            index = json.load(f)
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(index, dict):
+        return None
+    return {str(k): str(v) for k, v in index.items()}
 
 
-def build_objectid_to_webcastid_map(webinars: List[Dict[str, Any]]) -> Dict[str, str]:
+def build_objectid_to_webcastid_map(webinars: Iterable[Dict[str, Any]]) -> Dict[str, str]:
     mapping: Dict[str, str] = {}
     for w in webinars:
         obj = w.get("objectID")
@@ -71,14 +200,26 @@ def build_objectid_to_webcastid_map(webinars: List[Dict[str, Any]]) -> Dict[str,
     return mapping
 
 
-def merge_data_and_state() -> List[Dict[str, Any]]:
+def merge_data_and_state(user: str = DEFAULT_USER) -> List[Dict[str, Any]]:
     """
-    Combines data.json with state.json. Returns a list of webinar dicts
-    that the UI can safely consume (always has watched/favorite flags).
+    Combines data.jsonl with one user's state. Returns a list of webinar
+    dicts that the UI can safely consume (always has watched/favorite flags).
     """
-    data_webinars = load_data()
-    state = load_state()
+    return merge_webinars_with_state(load_data(), load_state(user))
+
+
+def merged_record(w: Dict[str, Any], st: Dict[str, Any]) -> Dict[str, Any]:
+    watched = bool(st.get("watched", False))
+    favorite = bool(st.get("favorite", False))
+    if isinstance(w, WebinarRecord):
+        # Shares the mapped columns instead of copying every field
+        return w.with_state(watched, favorite)  # type: ignore[return-value]
+    return {**w, "watched": watched, "favorite": favorite}
+
 
+def merge_webinars_with_state(
+    data_webinars: List[Dict[str, Any]], state: Dict[str, Dict[str, Any]]
+) -> List[Dict[str, Any]]:
     merged: List[Dict[str, Any]] = []
 
     for w in data_webinars:
@@ -88,27 +229,334 @@ def merge_data_and_state() -> List[Dict[str, Any]]:
             webcast_id = str(webcast_id_raw)
 
         st = state.get(webcast_id, {}) if webcast_id else {}
+        merged.append(merged_record(w, st))
 
-        merged.append(
-            {
-                **w,
-                "watched": bool(st.get("watched", False)),
-                "favorite": bool(st.get("favorite", False)),
-            }
-        )
+    return merged
+
+
+def webcast_id_positions(data_webinars: Iterable[Dict[str, Any]]) -> Dict[str, List[int]]:
+    positions: Dict[str, List[int]] = {}
+    for i, w in enumerate(data_webinars):
+        if w.get("webcastId") is not None:
+            positions.setdefault(str(w["webcastId"]), []).append(i)
+    return positions
 
+
+def overlay_state(
+    data_webinars: List[Dict[str, Any]],
+    unflagged: List[Dict[str, Any]],
+    positions: Dict[str, List[int]],
+    state: Dict[str, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    merge_webinars_with_state(data_webinars, state), given the records
+    merged with no state (`unflagged`) and webcast_id_positions(): only the
+    records in `state` are merged again, so the cost is a list copy plus
+    one step per state entry.
+    """
+    merged = list(unflagged)
+    for webcast_id, st in state.items():
+        for i in positions.get(webcast_id, ()):
+            merged[i] = merged_record(data_webinars[i], st)
     return merged
 
 
+# ---------- Catalog cache ------------------
+
+
+FileSignature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path: str) -> FileSignature:
+    """
+    (inode, mtime_ns, size) of a file, or None if it doesn't exist.
+    Any rewrite (in place or via rename) changes at least one of these.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def data_signature() -> Any:
+    if USE_SQLITE:
+        return ("sqlite", sqlitestore.versions()[0])
+    return file_signature(current_data_file())
+
+
+def state_signature(user: str = DEFAULT_USER) -> Any:
+    if USE_SQLITE:
+        return ("sqlite", sqlitestore.state_version(user))
+    return state_stores.store(user).signature()
+
+
+def catalog_version(user: str = DEFAULT_USER) -> Tuple[Any, Any]:
+    """Identifies one user's merged catalog (a CatalogCache key); a few stats."""
+    return (data_signature(), state_signature(user))
+
+
+def catalog_last_modified(user: str = DEFAULT_USER) -> float:
+    """Newest mtime among the files the user's merged catalog is built from."""
+    if USE_SQLITE:
+        return sqlitestore.last_modified()
+    store = state_stores.store(user)
+    mtimes = [0.0]
+    for path in (current_data_file(), store.snapshot_path, store.journal_path):
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(mtimes)
+
+
+# Serialized bodies kept per catalog version (full list, index page and
+# the most recently requested query pages)
+MAX_CACHED_BODIES = 64
+
+# Users whose merged catalog (and bodies) each process keeps
+MAX_CACHED_USERS = 32
+
+
+class UserCatalog:
+    """One user's state, merged catalog, query view and cached bodies."""
+
+    def __init__(self) -> None:
+        self.state_sig: Any = CatalogCache._UNSET
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self.merged_key: Any = CatalogCache._UNSET
+        self.merged: List[Dict[str, Any]] = []
+        self.view = CatalogView([])
+        self.last_modified = 0.0
+        self.bodies: Dict[Hashable, CachedBody] = {}
+
+
+class CatalogCache:
+    """
+    Per-process cache of parsed data.jsonl / state, the merged view and
+    its query view (search text + per-sort-mode orderings). Files are only re-parsed when their
+    signature changes, so gunicorn workers pick up writes from each other
+    (or from fetch.py) on the next request. With the sqlite backend the
+    signatures are the database's version counters.
+
+    The data is parsed and merged with no state once per data version;
+    each user's catalog is that list with only the records in their state
+    merged again (overlay_state), and their query view shares the search
+    text and data-only orderings. A user's toggle only invalidates their
+    own catalog, and costs in proportion to their own state.
+
+    Serialized responses (see cached_body) are kept per user and merged
+    version too, so unchanged catalogs are never re-encoded or re-compressed.
+
+    Cached lists are shared between requests: treat them as read-only.
+    """
+
+    _UNSET: Any = object()
+
+    def __init__(self) -> None:
+        # Re-entrant: a body builder may ask for another cached body
+        self._lock = threading.RLock()
+        self._data_sig: Any = self._UNSET
+        self._webinars: List[Dict[str, Any]] = []
+        self._unflagged: List[Dict[str, Any]] = []
+        self._positions: Dict[str, List[int]] = {}
+        self._data_view = CatalogView([])
+        self._users: "OrderedDict[str, UserCatalog]" = OrderedDict()
+        self._id_index_key: Any = self._UNSET
+        self._id_index: Dict[str, str] = {}
+        self._search_index_key: Any = self._UNSET
+        self._search_index = SearchIndex()
+        self.stats: Dict[str, int] = {
+            "data_hits": 0,
+            "data_misses": 0,
+            "state_hits": 0,
+            "state_misses": 0,
+            "merged_hits": 0,
+            "merged_misses": 0,
+            "id_index_hits": 0,
+            "id_index_misses": 0,
+            "search_index_hits": 0,
+            "search_index_misses": 0,
+            "body_hits": 0,
+            "body_misses": 0,
+        }
+
+    def _refresh_data(self) -> None:
+        sig = data_signature()
+        if sig == self._data_sig:
+            self.stats["data_hits"] += 1
+            return
+        self.stats["data_misses"] += 1
+        self._webinars = load_data()
+        with timed("merge"):
+            self._unflagged = merge_webinars_with_state(self._webinars, {})
+            self._positions = webcast_id_positions(self._webinars)
+        # Reuse the data-only sort orders fetch.py saved for this very data
+        orders = index_snapshot.sort_orders(version_tag("orders", sig))
+        self._data_view = CatalogView(self._unflagged, orders=orders)
+        self._data_sig = sig
+
+    def _user(self, user: str) -> UserCatalog:
+        entry = self._users.get(user)
+        if entry is None:
+            entry = self._users[user] = UserCatalog()
+            if len(self._users) > MAX_CACHED_USERS:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user)
+        return entry
+
+    def _refresh_state(self, entry: UserCatalog, user: str) -> None:
+        sig = state_signature(user)
+        if sig == entry.state_sig:
+            self.stats["state_hits"] += 1
+            return
+        self.stats["state_misses"] += 1
+        entry.state = load_state(user)
+        entry.state_sig = sig
+
+    def _refresh_merged(self, user: str) -> UserCatalog:
+        entry = self._user(user)
+        self._refresh_data()
+        self._refresh_state(entry, user)
+        key = (self._data_sig, entry.state_sig)
+        if key == entry.merged_key:
+            self.stats["merged_hits"] += 1
+            return entry
+        self.stats["merged_misses"] += 1
+        with timed("merge"):
+            entry.merged = overlay_state(
+                self._webinars, self._unflagged, self._positions, entry.state
+            )
+        entry.view = CatalogView(entry.merged, shared=self._data_view)
+        entry.last_modified = catalog_last_modified(user)
+        entry.bodies = {}
+        entry.merged_key = key
+        return entry
+
+    def _refresh_id_index(self) -> None:
+        sig = file_signature(ID_INDEX_FILE)
+        key = ("file", sig)
+        if sig is None:
+            # No index from fetch.py yet: derive it from the data file once
+            key = ("data", data_signature())
+        if key == self._id_index_key:
+            self.stats["id_index_hits"] += 1
+            return
+        self.stats["id_index_misses"] += 1
+        index = load_id_index() if sig is not None else None
+        if index is None:
+            index = build_objectid_to_webcastid_map(iter_data())
+        self._id_index = index
+        self._id_index_key = key
+
+    def _refresh_search_index(self) -> None:
+        sig = file_signature(SEARCH_INDEX_FILE)
+        key = ("file", sig)
+        if sig is None:
+            # Not built by fetch.py yet: index the current catalog in memory
+            key = ("data", data_signature())
+        if key == self._search_index_key:
+            self.stats["search_index_hits"] += 1
+            return
+        self.stats["search_index_misses"] += 1
+        index = load_search_index(SEARCH_INDEX_FILE) if sig is not None else None
+        if index is None:
+            index = SearchIndex.build(iter_data())
+        self._search_index = index
+        self._search_index_key = key
+
+    def webinars(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh_data()
+            return self._webinars
+
+    def merged(self, user: str = DEFAULT_USER) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._refresh_merged(user).merged
+
+    def data_view(self) -> Tuple[str, CatalogView]:
+        """The stateless view (orders tag, view) the users' views share."""
+        with self._lock:
+            self._refresh_data()
+            return (version_tag("orders", self._data_sig), self._data_view)
+
+    def view(self, user: str = DEFAULT_USER) -> CatalogView:
+        with self._lock:
+            return self._refresh_merged(user).view
+
+    def cached_body(
+        self,
+        key: Hashable,
+        render: Callable[[CatalogView], bytes],
+        mimetype: str,
+        user: str = DEFAULT_USER,
+    ) -> CachedBody:
+        """
+        render(view) for the user's current catalog version, computed once
+        and kept (with its compressed variants) until data or their state
+        changes.
+        """
+        return self.cached_body_and_view(key, render, mimetype, user)[0]
+
+    def cached_body_and_view(
+        self,
+        key: Hashable,
+        render: Callable[[CatalogView], bytes],
+        mimetype: str,
+        user: str = DEFAULT_USER,
+    ) -> Tuple[CachedBody, CatalogView]:
+        """cached_body plus the view it was rendered from."""
+        with self._lock:
+            entry = self._refresh_merged(user)
+            cached = entry.bodies.get(key)
+            if cached is not None:
+                self.stats["body_hits"] += 1
+                return (cached, entry.view)
+            self.stats["body_misses"] += 1
+            # The default user's tags are the ones IndexSnapshot compares
+            tag_parts = (key,) if user == DEFAULT_USER else (key, user)
+            cached = CachedBody(
+                render(entry.view),
+                version_tag(*tag_parts, entry.merged_key),
+                entry.last_modified,
+                mimetype,
+            )
+            if len(entry.bodies) >= MAX_CACHED_BODIES:
+                # Oldest first (dicts keep insertion order)
+                del entry.bodies[next(iter(entry.bodies))]
+            entry.bodies[key] = cached
+            return (cached, entry.view)
+
+    def id_index(self) -> Dict[str, str]:
+        with self._lock:
+            self._refresh_id_index()
+            return self._id_index
+
+    def search_index(self) -> SearchIndex:
+        with self._lock:
+            self._refresh_search_index()
+            return self._search_index
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+
+catalog_cache = CatalogCache()
+
+
 def resolve_webcast_id(
     *,
-    webinars: List[Dict[str, Any]],
     webcast_id: Optional[str],
-    object_id: Optional[str]
+    object_id: Optional[str],
+    id_index: Optional[Dict[str, str]] = None
 ) -> Optional[str]:
     """
     Prefer explicit webcastId.
-    If only objectID is provided, map it to webcastId using data.json.
+    If only objectID is provided, map it to webcastId using the in-memory
+    objectID index (id_index.json, or the data file when fetch.py hasn't
+    written one yet), or the indexed objectID column with sqlite.
     """
     if webcast_id:
         return webcast_id
@@ -116,9 +564,265 @@ def resolve_webcast_id(
     if not object_id:
         return None
 
-    # Build map objectID -> webcastId
-    mapping = build_objectid_to_webcastid_map(webinars)
-    return mapping.get(object_id)
+    if id_index is None and USE_SQLITE:
+        return sqlitestore.resolve_object_id(object_id)
+    if id_index is None:
+        id_index = catalog_cache.id_index()
+    return id_index.get(object_id)
+
+
+def webcast_id_from_payload(payload: Dict[str, Any]) -> Optional[str]:
+    raw_webcast_id = payload.get("webcastId")
+    if raw_webcast_id is not None:
+        # Explicit webcastId: no need to look at the data file at all
+        return str(raw_webcast_id)
+
+    # Allow old clients sending only objectID
+    raw_object_id = payload.get("objectID")
+    object_id = str(raw_object_id) if raw_object_id is not None else None
+    return resolve_webcast_id(webcast_id=None, object_id=object_id)
+
+
+# ---------- Cached response bodies ------------------
+
+
+def json_bytes(payload: Any) -> bytes:
+    # Same encoder settings as jsonify; HTML-safe so it can be embedded too
+    with timed("json_encode"):
+        return htmlsafe_json(app.json.dumps(payload)).encode("utf-8")
+
+
+def cached_json(
+    key: Hashable, build: Callable[[CatalogView], Any], user: str = DEFAULT_USER
+) -> CachedBody:
+    return catalog_cache.cached_body(
+        key, lambda view: json_bytes(build(view)), "application/json", user
+    )
+
+
+def sqlite_query_body(query: WebinarQuery, user: str = DEFAULT_USER) -> CachedBody:
+    # Filtered, sorted and paged by the database: no merged catalog in memory
+    tag = version_tag("query", astuple(query), user, catalog_version(user))
+    with timed("sql_query"):
+        page = sqlitestore.query_webinars(query, user=user)
+    return CachedBody(json_bytes(page), tag, catalog_last_modified(user), "application/json")
+
+
+def initial_page_body(user: str = DEFAULT_USER) -> CachedBody:
+    # Shared by the page (window.INITIAL_PAGE) and /api/webinars requests
+    # for the default query, e.g. the front end's first fetch
+    return cached_json(
+        ("query", astuple(WebinarQuery())), lambda view: view.query(WebinarQuery()), user
+    )
+
+
+def render_index(view: CatalogView, user: str = DEFAULT_USER) -> bytes:
+    initial_page_json = Markup(initial_page_body(user).body.decode("utf-8"))
+    with timed("render"):
+        return render_template(
+            "index.html", initial_page_json=initial_page_json, user=user
+        ).encode("utf-8")
+
+
+class IndexSnapshot:
+    """
+    The default user's rendered index page on disk (other users' pages
+    are only cached in memory), with a meta file holding the catalog
+    version it was rendered for and its Last-Modified, so workers serve /
+    without loading the catalog and nginx can serve the file.
+
+    A watched/favorite change only deletes the page (invalidate); the next
+    request for / renders it again, once, however many toggles came in
+    between. fetch.py also saves the data-only sort orders next to it, once
+    per dataset, which every worker's CatalogView starts from.
+    """
+
+    def __init__(self, html_path: str, meta_path: str, orders_path: str) -> None:
+        self.html_path = html_path
+        self.meta_path = meta_path
+        self.orders_path = orders_path
+        self.lock_path = f"{html_path}.lock"
+        self._lock = threading.Lock()
+        self._cached: Optional[CachedBody] = None
+        self._orders_tag: Optional[str] = None
+
+    @staticmethod
+    def _read_json(path: str) -> Dict[str, Any]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return meta if isinstance(meta, dict) else {}
+
+    def load(self, tag: str) -> Optional[CachedBody]:
+        """The saved page if it was rendered for catalog version `tag`."""
+        with self._lock:
+            if self._cached is not None and self._cached.tag == tag:
+                return self._cached
+            meta = self._read_json(self.meta_path)
+            if meta.get("tag") != tag:
+                return None
+            try:
+                with open(self.html_path, "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                return None
+            # The page and the meta file are replaced one after the other;
+            # the digest catches a reader that got one of each
+            if hashlib.blake2b(body, digest_size=16).hexdigest() != meta.get("digest"):
+                return None
+            self._cached = CachedBody(body, tag, meta.get("last_modified", 0), "text/html")
+            return self._cached
+
+    def invalidate(self) -> None:
+        """Called after a state change: drop the page until someone asks for /."""
+        try:
+            os.unlink(self.html_path)
+        except FileNotFoundError:
+            pass
+
+    def write(self) -> CachedBody:
+        """Render the current catalog version and save it."""
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with FileLock(self.lock_path, exclusive=True):
+            # Another worker may have rendered it while we waited
+            cached = self.load(version_tag("index", catalog_version()))
+            if cached is not None:
+                return cached
+            with app.test_request_context("/"):
+                cached = catalog_cache.cached_body("index", render_index, "text/html")
+            with self._lock:
+                self._cached = cached
+                with timed("snapshot_write"):
+                    atomic_write_bytes(self.html_path, cached.body)
+                    meta = {
+                        "tag": cached.tag,
+                        "digest": hashlib.blake2b(cached.body, digest_size=16).hexdigest(),
+                        "last_modified": cached.last_modified,
+                    }
+                    atomic_write_json(self.meta_path, meta, separators=(",", ":"))
+        # A state change that landed during the render has already tried to
+        # delete the page; if it ran before the write, delete it here instead
+        if version_tag("index", catalog_version()) != cached.tag:
+            self.invalidate()
+        return cached
+
+    def sort_orders(self, tag: str) -> Optional[Dict[str, List[int]]]:
+        """The saved data-only orders if they were computed for `tag`."""
+        saved = self._read_json(self.orders_path)
+        self._orders_tag = saved.get("tag")
+        if saved.get("tag") != tag or not isinstance(saved.get("orders"), dict):
+            return None
+        return saved["orders"]
+
+    def write_sort_orders(self) -> None:
+        """Compute every data-only order for the current dataset and save them."""
+        tag, view = catalog_cache.data_view()
+        if tag == self._orders_tag:
+            return
+        for mode in SORT_MODES:
+            if mode not in STATE_SORT_MODES:
+                view.order(mode)
+        os.makedirs(os.path.dirname(self.orders_path) or ".", exist_ok=True)
+        with timed("snapshot_write"):
+            atomic_write_json(
+                self.orders_path, {"tag": tag, "orders": view.orders()}, separators=(",", ":")
+            )
+        self._orders_tag = tag
+
+
+index_snapshot = IndexSnapshot(INDEX_SNAPSHOT_FILE, INDEX_SNAPSHOT_META_FILE, SORT_ORDERS_FILE)
+
+
+def write_index_snapshot() -> None:
+    """Called by fetch.py once the dataset and side files are saved."""
+    index_snapshot.write_sort_orders()
+    index_snapshot.write()
+
+
+# ---------- Metrics and profiling ------------------
+
+
+def cache_metrics() -> Dict[str, Dict[str, Any]]:
+    # CatalogCache.stats ("data_hits", "body_misses", ...) as one counter
+    series = []
+    for key, value in catalog_cache.snapshot_stats().items():
+        cache, _, result = key.rpartition("_")
+        series.append([[cache, "hit" if result == "hits" else "miss"], value])
+    return {
+        metrics.CACHE_REQUESTS: {
+            "type": "counter",
+            "help": "CatalogCache lookups by cache and result",
+            "labels": ["cache", "result"],
+            "series": series,
+        }
+    }
+
+
+metrics.registry.collectors.append(cache_metrics)
+
+
+def route_label() -> str:
+    # The URL rule, not the path, so the label set stays small
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+@app.before_request
+def start_request_metrics() -> None:
+    g.request_started = time.perf_counter()
+    if metrics.ENABLED:
+        metrics.registry.start_flusher()
+    if metrics.should_profile(request.args.get("profile") == "1"):
+        g.profile = metrics.RequestProfile(route_label().strip("/").replace("/", "_") or "index")
+
+
+@app.after_request
+def finish_request_metrics(response: Response) -> Response:
+    profile = g.pop("profile", None)
+    if profile is not None:
+        response.headers["X-Profile"] = profile.stop()
+    route = route_label()
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - g.request_started, route=route, method=request.method
+    )
+    metrics.REQUESTS.inc(route=route, status=str(response.status_code))
+    if not response.is_streamed and response.content_length is not None:
+        metrics.RESPONSE_BYTES.observe(response.content_length, route=route)
+    return response
+
+
+# ---------- Users ------------------
+
+
+def resolve_user(header: Optional[str], cookie: Optional[str]) -> str:
+    """The user a request acts for; ValueError for an unusable name."""
+    if not TRUST_USER_COOKIE:
+        cookie = None
+    return normalize_user(header or cookie)
+
+
+@app.before_request
+def start_request_user() -> Optional[Tuple[Response, int]]:
+    try:
+        g.user = resolve_user(request.headers.get(USER_HEADER), request.cookies.get(USER_COOKIE))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return None
+
+
+@app.after_request
+def vary_on_user(response: Response) -> Response:
+    # Same URL, different user, different body: keep shared caches apart
+    response.vary.add(USER_HEADER)
+    if TRUST_USER_COOKIE:
+        response.vary.add("Cookie")
+    return response
+
+
+def current_user() -> str:
+    # DEFAULT_USER outside requests, e.g. fetch.py rendering the snapshot
+    return g.get("user", DEFAULT_USER)
 
 
 # ---------- Routes ------------------
@@ -126,60 +830,274 @@ def resolve_webcast_id(
 
 @app.route("/")
 def index():
-    # Combine data + state before rendering
-    webinars = merge_data_and_state()
-
-    # You can pre-sort here if you want, but the Alpine front-end already
-    # does client-side sorting. This is just a reasonable default:
-    webinars_sorted = sorted(
-        webinars,
-        key=lambda w: (
-            int(w.get("duration_bucket", 999)),
-            -int(w.get("createdAtTimestamp") or 0),  # newer first within bucket
-            (w.get("title") or "").lower(),
-        ),
-    )
-
-    return render_template("index.html", webinars=webinars_sorted)
+    # Only the first page of the default ordering is embedded; the page
+    # fetches the rest from /api/webinars as the user scrolls or filters.
+    # The default user's page is served from the pre-rendered snapshot
+    # while it matches the current catalog and rendered again (once, for
+    # every worker) after a change; anyone else's is kept in memory.
+    user = current_user()
+    if user != DEFAULT_USER:
+        cached = catalog_cache.cached_body(
+            "index", lambda view: render_index(view, user), "text/html", user
+        )
+        return cached_response(request, cached)
+    cached = index_snapshot.load(version_tag("index", catalog_version())) or index_snapshot.write()
+    return cached_response(request, cached)
 
 
 @app.route("/api/webinars")
 def api_webinars():
-    webinars = merge_data_and_state()
-    return jsonify(webinars)
+    """
+    Without query args: the full merged catalog (legacy clients).
+    With any of q, duration, watched, favorites, cysa, sort, offset, limit:
+    one filtered, sorted page (see query.CatalogView.query).
+    """
+    user = current_user()
+    if not request.args:
+        return cached_response(request, cached_json("webinars", lambda view: view.webinars, user))
 
+    try:
+        query = parse_query_args(request.args)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
-@app.route("/api/toggle-watched", methods=["POST"])
-def toggle_watched():
-    payload = request.get_json(force=True, silent=True) or {}
-    raw_webcast_id = payload.get("webcastId")
-    raw_object_id = payload.get("objectID")
-    watched = payload.get("watched")
+    if USE_SQLITE:
+        return cached_response(request, sqlite_query_body(query, user))
 
-    if watched is None:
-        return jsonify({"ok": False, "error": "Missing watched flag"}), 400
+    # The default query shares its body with the embedded initial page
+    return cached_response(
+        request, cached_json(("query", astuple(query)), lambda view: view.query(query), user)
+    )
 
-    webinars = load_data()
-    webcast_id = None
-    if raw_webcast_id is not None:
-        webcast_id = str(raw_webcast_id)
-    else:
-        # Allow old clients sending only objectID
-        object_id = str(raw_object_id) if raw_object_id is not None else None
-        webcast_id = resolve_webcast_id(
-            webinars=webinars,
-            webcast_id=None,
-            object_id=object_id,
+
+@app.route("/api/search")
+def api_search():
+    """
+    Ranked (BM25) search: ?q=threat hun&limit=20. Results are merged
+    webinars with a "score" field, best first.
+    """
+    q = request.args.get("q", "")
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return jsonify({"ok": False, "error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    hits, total = catalog_cache.search_index().search(q, limit=limit)
+    by_id = catalog_cache.view(current_user()).by_webcast_id()
+    items = [
+        {**by_id[webcast_id], "score": score}
+        for webcast_id, score in hits
+        if webcast_id in by_id
+    ]
+    return jsonify({"items": items, "total": total})
+
+
+@app.route("/api/changes")
+def api_changes():
+    """
+    Delta sync for the browser's local copy: ?epoch=<epoch>&since=<version>
+    from its last sync. Returns {"epoch", "version", "reset", "webinars",
+    "state", "removed"}: merged records added or changed since then, flags
+    of records whose watched/favorite state changed, and removed webcastIds.
+    "reset": true means start over from /api/webinars and keep the returned
+    epoch/version.
+    """
+    try:
+        since = int(request.args.get("since", -1))
+    except ValueError:
+        return jsonify({"ok": False, "error": "since must be an integer"}), 400
+    epoch = request.args.get("epoch", "")
+
+    # The version is read before the catalog, so a change landing in between
+    # is at worst sent twice, never missed
+    changes = change_feed.changes_since(epoch, since)
+    if changes is None:
+        epoch, version = change_feed.start()
+        return jsonify(
+            {"epoch": epoch, "version": version, "reset": True, "webinars": [], "state": [], "removed": []}
+        )
+
+    by_id = catalog_cache.view(current_user()).by_webcast_id()
+    webinars = [by_id[i] for i in sorted(changes.webinars) if i in by_id]
+    return jsonify(
+        {
+            "epoch": epoch,
+            "version": changes.version,
+            "reset": False,
+            "webinars": webinars,
+            "state": state_entries(changes, by_id),
+            "removed": sorted(changes.removed),
+        }
+    )
+
+
+def state_entries(changes: ChangeSet, by_id: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Records that changed as a whole are sent in full instead
+    return [
+        {"webcastId": i, "watched": by_id[i]["watched"], "favorite": by_id[i]["favorite"]}
+        for i in sorted(changes.state - changes.webinars)
+        if i in by_id
+    ]
+
+
+def sse_message(event: str, seen: Tuple[str, int], payload: Dict[str, Any]) -> str:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {seen[0]}:{seen[1]}\nevent: {event}\ndata: {data}\n\n"
+
+
+def pending_change_messages(
+    seen: Tuple[str, int], user: str = DEFAULT_USER
+) -> Tuple[Tuple[str, int], List[str]]:
+    """
+    SSE messages for everything logged after `seen`, and the new position.
+    The log doesn't say whose state changed: "state" events carry the
+    listening user's flags for every webinar anyone toggled.
+    """
+    changes = change_feed.changes_since(*seen)
+    if changes is None:
+        # The log was recreated: clients start over
+        seen = change_feed.start()
+        return (seen, [sse_message("reset", seen, {"epoch": seen[0], "version": seen[1]})])
+
+    seen = (seen[0], changes.version)
+    messages: List[str] = []
+    if changes.webinars or changes.removed:
+        messages.append(
+            sse_message(
+                "data",
+                seen,
+                {
+                    "version": changes.version,
+                    "changed": len(changes.webinars),
+                    "removed": len(changes.removed),
+                },
+            )
+        )
+    if changes.state - changes.webinars:
+        by_id = catalog_cache.view(user).by_webcast_id()
+        messages.append(
+            sse_message(
+                "state",
+                seen,
+                {"version": changes.version, "state": state_entries(changes, by_id)},
+            )
         )
+    return (seen, messages)
+
+
+def events_enabled(multithread: bool) -> bool:
+    if EVENTS_MODE in ("0", "off"):
+        return False
+    return multithread or EVENTS_MODE in ("1", "on")
+
+
+def change_events(seen: Tuple[str, int], user: str = DEFAULT_USER) -> Iterator[str]:
+    yield f"retry: {EVENT_RETRY_MS}\n\n"
+    deadline = time.monotonic() + EVENT_STREAM_SECONDS
+    while time.monotonic() < deadline:
+        if change_watcher.wait(seen, EVENT_KEEPALIVE_SECONDS) == seen:
+            yield ": keepalive\n\n"
+            continue
+        seen, messages = pending_change_messages(seen, user)
+        yield from messages
+
+
+def parse_last_event_id(value: str) -> Optional[Tuple[str, int]]:
+    epoch, _, version = value.rpartition(":")
+    if epoch and version.isdigit():
+        return (epoch, int(version))
+    return None
+
+
+@app.route("/api/events")
+def api_events():
+    """
+    Server-Sent Events for other tabs and devices: "state" (watched/
+    favorite flags that changed), "data" (fetch.py saved new or changed
+    webinars) and "reset" (change log recreated). Event ids are
+    "<epoch>:<version>", so a reconnecting EventSource resumes where it
+    left off. Each open stream holds a worker thread, so a server that
+    can't spare one (sync workers) answers 204 (see EVENTS_MODE).
+    """
+    if not events_enabled(bool(request.environ.get("wsgi.multithread"))):
+        # EventSource gives up for good on a 204; the page polls instead
+        return Response(status=204)
+
+    seen = parse_last_event_id(request.headers.get("Last-Event-ID", ""))
+    if seen is None:
+        seen = change_feed.start()
+
+    # The generator runs after the request context is gone
+    response = Response(change_events(seen, current_user()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
+
+
+@app.route("/api/cache-stats")
+def api_cache_stats():
+    return jsonify(catalog_cache.snapshot_stats())
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    if not metrics.ENABLED:
+        return jsonify({"ok": False, "error": "Metrics are off (set WEBINARHUNT_METRICS=1)"}), 404
+    return Response(metrics.exposition(), mimetype="text/plain; version=0.0.4")
 
+
+def toggle_update(payload: Dict[str, Any], flag: str) -> Update:
+    """
+    (webcastId, {flag: bool}) from a toggle request body. Raises
+    ValueError with a client-facing message if it can't be applied.
+    """
+    value = payload.get(flag)
+    if value is None:
+        raise ValueError(f"Missing {flag} flag")
+
+    webcast_id = webcast_id_from_payload(payload)
     if not webcast_id:
-        return jsonify({"ok": False, "error": "webcastId could not be resolved"}), 400
+        raise ValueError("webcastId could not be resolved")
 
-    state = load_state()
-    st = state.get(webcast_id, {})
-    st["watched"] = bool(watched)
-    state[webcast_id] = st
-    save_state(state)
+    return (webcast_id, {flag: bool(value)})
+
+
+def batch_updates(payload: Dict[str, Any]) -> List[Update]:
+    """
+    Updates from {"updates": [{"webcastId": "123", "watched": true}, ...]}.
+    Raises ValueError for the first invalid one, so nothing is applied.
+    """
+    raw_updates = payload.get("updates")
+    if not isinstance(raw_updates, list):
+        raise ValueError("Missing updates list")
+
+    updates: List[Update] = []
+    for i, item in enumerate(raw_updates):
+        if not isinstance(item, dict):
+            raise ValueError(f"Update {i} is not an object")
+
+        flags = {k: bool(item[k]) for k in STATE_FLAGS if item.get(k) is not None}
+        if not flags:
+            raise ValueError(f"Update {i} has no watched/favorite flag")
+
+        webcast_id = webcast_id_from_payload(item)
+        if not webcast_id:
+            raise ValueError(f"Update {i}: webcastId could not be resolved")
+
+        updates.append((webcast_id, flags))
+    return updates
+
+
+@app.route("/api/toggle-watched", methods=["POST"])
+def toggle_watched():
+    payload = request.get_json(force=True, silent=True) or {}
+    try:
+        update = toggle_update(payload, "watched")
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    update_state([update], current_user())
 
     return jsonify({"ok": True})
 
@@ -187,37 +1105,35 @@ def toggle_watched():
 @app.route("/api/toggle-favorite", methods=["POST"])
 def toggle_favorite():
     payload = request.get_json(force=True, silent=True) or {}
-    raw_webcast_id = payload.get("webcastId")
-    raw_object_id = payload.get("objectID")
-    favorite = payload.get("favorite")
+    try:
+        update = toggle_update(payload, "favorite")
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
-    if favorite is None:
-        return jsonify({"ok": False, "error": "Missing favorite flag"}), 400
+    update_state([update], current_user())
 
-    webinars = load_data()
-    webcast_id = None
-    if raw_webcast_id is not None:
-        webcast_id = str(raw_webcast_id)
-    else:
-        object_id = str(raw_object_id) if raw_object_id is not None else None
-        webcast_id = resolve_webcast_id(
-            webinars=webinars,
-            webcast_id=None,
-            object_id=object_id,
-        )
+    return jsonify({"ok": True})
 
-    if not webcast_id:
-        return jsonify({"ok": False, "error": "webcastId could not be resolved"}), 400
 
-    state = load_state()
-    st = state.get(webcast_id, {})
-    st["favorite"] = bool(favorite)
-    state[webcast_id] = st
-    save_state(state)
+@app.route("/api/state/batch", methods=["POST"])
+def state_batch():
+    """
+    Apply many toggles in one request:
+        {"updates": [{"webcastId": "123", "watched": true}, ...]}
+    Each update may use objectID instead of webcastId. Nothing is written
+    unless every update is valid.
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    try:
+        updates = batch_updates(payload)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
-    return jsonify({"ok": True})
+    update_state(updates, current_user())
+
+    return jsonify({"ok": True, "applied": len(updates)})
 
 
 if __name__ == "__main__":
-    # Dev server; in prod you use gunicorn: gunicorn -b 0.0.0.0:8411 'app:app'
+    # Dev server; in prod use gunicorn with threaded workers (see README)
     app.run(host="0.0.0.0", port=8411, debug=True)
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# asgi.py
+#
+# Async serving mode for app.py, one process for many concurrent clients:
+#
+#   pip install uvicorn
+#   uvicorn asgi:app --host 0.0.0.0 --port 8411
+#
+# - Everything read-only runs the Flask app on a bounded thread pool, so
+#   disk reads never block the event loop and at most READ_THREADS
+#   requests touch the disk at once; the rest wait on the loop for free.
+# - State mutations are validated on that pool but written by a single
+#   writer task, which folds whatever toggles are queued into one
+#   update_state() call per user: one journal fsync and change-feed append
+#   per batch instead of per request. A batch for the default user also
+#   drops the rendered index snapshot (an unlink); the next GET / renders
+#   it again, once, however many batches came in between.
+# - /api/events streams are coroutines, so an open stream holds no thread.
+
+import asyncio
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import CookieError, SimpleCookie
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import app as flask_app
+import metrics
+from changefeed import DEFAULT_POLL_INTERVAL
+from statestore import Update
+
+READ_THREADS = 16
+
+# Most toggles folded into one update_state() call
+MAX_WRITE_BATCH = 1000
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+Headers = List[Tuple[bytes, bytes]]
+
+read_pool = ThreadPoolExecutor(max_workers=READ_THREADS, thread_name_prefix="read")
+
+
+async def in_pool(fn: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(read_pool, fn, *args)
+
+
+# ---------- Flask bridge (reads) ------------------
+
+
+def wsgi_environ(scope: Scope, body: bytes) -> Dict[str, Any]:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        # WSGI wants the decoded path as latin-1 "bytes in a str"
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_flask(environ: Dict[str, Any]) -> Tuple[int, Headers, bytes]:
+    started: Dict[str, Any] = {}
+
+    def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> None:
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    chunks = flask_app.app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    return (started["status"], started["headers"], body)
+
+
+def scope_user(scope: Scope) -> str:
+    """app.current_user() for requests answered without Flask."""
+    headers = dict(scope.get("headers", []))
+    header = headers.get(flask_app.USER_HEADER.lower().encode("latin-1"), b"")
+    cookies: SimpleCookie = SimpleCookie()
+    try:
+        cookies.load(headers.get(b"cookie", b"").decode("latin-1"))
+    except CookieError:
+        pass
+    morsel = cookies.get(flask_app.USER_COOKIE)
+    return flask_app.resolve_user(header.decode("latin-1"), morsel.value if morsel else None)
+
+
+# ---------- State writer ------------------
+
+
+class StateWriter:
+    """
+    The only code path that writes state in this process. Requests queue
+    their (already validated) updates and wait; the writer applies
+    everything queued so far in one update_state() call per user, in
+    arrival order, so the last toggle of a webinar still wins. A failed
+    write only fails the requests of that user.
+    """
+
+    def __init__(self, max_batch: int = MAX_WRITE_BATCH) -> None:
+        self.max_batch = max_batch
+        self.batches = 0
+        self.updates = 0
+        self._queue: Optional["asyncio.Queue[Tuple[str, List[Update], asyncio.Future]]"] = None
+        # A thread of its own: a write never waits behind reads in read_pool
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-writer")
+
+    async def submit(self, updates: List[Update], user: str = flask_app.DEFAULT_USER) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            asyncio.get_running_loop().create_task(self._run())
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put((user, updates, done))
+        await done
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+
+            by_user: Dict[str, List[Tuple[List[Update], asyncio.Future]]] = {}
+            for user, pending, done in batch:
+                by_user.setdefault(user, []).append((pending, done))
+            for user, requests in by_user.items():
+                updates = [u for pending, _ in requests for u in pending]
+                try:
+                    await loop.run_in_executor(
+                        self._executor, flask_app.update_state, updates, user
+                    )
+                except Exception as e:
+                    for _, done in requests:
+                        if not done.done():
+                            done.set_exception(e)
+                    continue
+                self.batches += 1
+                self.updates += len(updates)
+                for _, done in requests:
+                    if not done.done():
+                        done.set_result(None)
+
+
+state_writer = StateWriter()
+
+
+# ---------- Change notifications ------------------
+
+
+class ChangeNotifier:
+    """
+    asyncio counterpart of changefeed.ChangeWatcher: one task per process
+    polls the change feed and wakes every waiting event stream.
+    """
+
+    def __init__(self, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.poll_interval = poll_interval
+        self._cond: Optional[asyncio.Condition] = None
+        self._current: Tuple[str, int] = ("", 0)
+
+    async def wait(self, seen: Tuple[str, int], timeout: float) -> Tuple[str, int]:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+            self._current = await in_pool(flask_app.change_feed.current)
+            asyncio.get_running_loop().create_task(self._run())
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._current != seen), timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+            return self._current
+
+    async def _run(self) -> None:
+        assert self._cond is not None
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await in_pool(flask_app.change_feed.current)
+            if current != self._current:
+                async with self._cond:
+                    self._current = current
+                    self._cond.notify_all()
+
+
+change_notifier = ChangeNotifier()
+
+
+# ---------- ASGI plumbing ------------------
+
+
+async def read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_response(send: Send, status: int, headers: Headers, body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send: Send, status: int, payload: Dict[str, Any]) -> None:
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8") + b"\n"
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("ascii")),
+    ]
+    await send_response(send, status, headers, body)
+
+
+def json_payload(body: bytes) -> Dict[str, Any]:
+    # Same leniency as request.get_json(force=True, silent=True) or {}
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+async def handle_flask(scope: Scope, receive: Receive, send: Send) -> None:
+    body = await read_body(receive)
+    status, headers, data = await in_pool(call_flask, wsgi_environ(scope, body))
+    await send_response(send, status, headers, data)
+
+
+async def handle_state(
+    scope: Scope, receive: Receive, send: Send, parse: Callable[[Dict[str, Any]], List[Update]]
+) -> None:
+    started = time.perf_counter()
+    payload = json_payload(await read_body(receive))
+    try:
+        user = scope_user(scope)
+        # May resolve objectIDs from disk, so not on the loop
+        updates = await in_pool(parse, payload)
+    except ValueError as e:
+        status, body = 400, {"ok": False, "error": str(e)}
+    else:
+        await state_writer.submit(updates, user)
+        status, body = 200, {"ok": True}
+        if scope["path"] == "/api/state/batch":
+            body["applied"] = len(updates)
+    await send_json(send, status, body)
+
+    # Served without Flask, so recorded here rather than in its hooks
+    if metrics.ENABLED:
+        metrics.registry.start_flusher()
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, route=scope["path"], method="POST")
+    metrics.REQUESTS.inc(route=scope["path"], status=str(status))
+
+
+async def handle_events(scope: Scope, receive: Receive, send: Send) -> None:
+    # A coroutine per stream, no thread: only WEBINARHUNT_EVENTS=0 turns it off
+    if not flask_app.events_enabled(multithread=True):
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    try:
+        user = scope_user(scope)
+    except ValueError as e:
+        await send_json(send, 400, {"ok": False, "error": str(e)})
+        return
+    headers = dict(scope.get("headers", []))
+    seen = flask_app.parse_last_event_id(headers.get(b"last-event-id", b"").decode("latin-1"))
+    if seen is None:
+        seen = await in_pool(flask_app.change_feed.start)
+
+    disconnected = asyncio.get_running_loop().create_task(wait_disconnect(receive))
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+
+    async def emit(text: str) -> None:
+        await send({"type": "http.response.body", "body": text.encode("utf-8"), "more_body": True})
+
+    try:
+        await emit(f"retry: {flask_app.EVENT_RETRY_MS}\n\n")
+        deadline = time.monotonic() + flask_app.EVENT_STREAM_SECONDS
+        while time.monotonic() < deadline and not disconnected.done():
+            current = await change_notifier.wait(seen, flask_app.EVENT_KEEPALIVE_SECONDS)
+            if current == seen:
+                await emit(": keepalive\n\n")
+                continue
+            seen, messages = await in_pool(flask_app.pending_change_messages, seen, user)
+            for message in messages:
+                await emit(message)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+
+
+async def wait_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _toggle(flag: str) -> Callable[[Dict[str, Any]], List[Update]]:
+    return lambda payload: [flask_app.toggle_update(payload, flag)]
+
+
+STATE_ROUTES: Dict[str, Callable[[Dict[str, Any]], List[Update]]] = {
+    "/api/toggle-watched": _toggle("watched"),
+    "/api/toggle-favorite": _toggle("favorite"),
+    "/api/state/batch": flask_app.batch_updates,
+}
+
+
+async def lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path, method = scope["path"], scope["method"]
+    if method == "POST" and path in STATE_ROUTES:
+        await handle_state(scope, receive, send, STATE_ROUTES[path])
+    elif method == "GET" and path == "/api/events":
+        await handle_events(scope, receive, send)
+    else:
+        await handle_flask(scope, receive, send)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# bench/bench_columnar.py
+#
+# Loading the catalog in app.py from data.jsonl (one dict per record) vs
+# the mapped data.columns (WebinarRecords): load + merge time, memory
+# held by the merged list, and the first sort and full-list encode that
+# follow a load. Each mode runs in its own subprocess.
+#
+#   python bench/bench_columnar.py --records 100000
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fetch  # noqa: E402
+from columnar import COLUMNAR_FILE, ColumnarWriter  # noqa: E402
+from datafile import DATA_FILE, NdjsonWriter, iter_records  # noqa: E402
+from stub_algolia import synthetic_hit  # noqa: E402
+
+
+def write_dataset(directory: str, n: int) -> None:
+    path = os.path.join(directory, DATA_FILE)
+    with NdjsonWriter(path) as out:
+        for i in range(n):
+            out.write(fetch.transform_hit(synthetic_hit(i)))
+    with ColumnarWriter(os.path.join(directory, COLUMNAR_FILE), path) as columns:
+        for w in iter_records(path):
+            columns.write(w)
+
+
+def measure(mode: str, directory: str) -> Dict[str, Any]:
+    os.chdir(directory)
+    if mode == "ndjson":
+        os.remove(COLUMNAR_FILE)
+    import app  # after chdir: its file paths are relative
+    from query import CatalogView
+
+    start = time.perf_counter()
+    merged = app.merge_webinars_with_state(app.load_data(), app.load_state())
+    load_s = time.perf_counter() - start
+
+    # Again under tracemalloc (which slows it down too much to time)
+    del merged
+    tracemalloc.start()
+    merged = app.merge_webinars_with_state(app.load_data(), app.load_state())
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    CatalogView(merged).order("relevance")
+    sort_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    body = app.json_bytes(merged)
+    encode_s = time.perf_counter() - start
+
+    return {
+        "records": len(merged),
+        "record_type": type(merged[0]).__name__,
+        "load_merge_ms": round(load_s * 1000, 1),
+        "held_mb": round(held / 2**20, 1),
+        "first_sort_ms": round(sort_s * 1000, 1),
+        "encode_all_ms": round(encode_s * 1000, 1),
+        "encoded_mb": round(len(body) / 2**20, 1),
+        # KiB on Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="data.jsonl vs data.columns in app.py")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--mode", choices=["ndjson", "columnar"], help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.dir)))
+        return
+
+    results: Dict[str, Any] = {"records": args.records}
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_dataset(tmp, args.records)
+        results["write_s"] = round(time.perf_counter() - start, 1)
+        results["data_jsonl_mb"] = round(os.path.getsize(os.path.join(tmp, DATA_FILE)) / 2**20, 1)
+        results["data_columns_mb"] = round(
+            os.path.getsize(os.path.join(tmp, COLUMNAR_FILE)) / 2**20, 1
+        )
+        # columnar first: the ndjson run deletes data.columns
+        for mode in ("columnar", "ndjson"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--dir", tmp],
+                check=True,
+                capture_output=True,
+                text=True,
+                env={k: v for k, v in os.environ.items() if k != "WEBINARHUNT_STORAGE"},
+            ).stdout
+            results[mode] = json.loads(out)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# bench/bench_index.py
+#
+# Requests/second for GET / under gunicorn against a synthetic catalog.
+# Point --app-dir at another checkout to compare revisions:
+#
+#   git worktree add /tmp/before HEAD~1
+#   python bench/bench_index.py --records 10000 --app-dir /tmp/before
+#   python bench/bench_index.py --records 10000
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fetch  # noqa: E402
+from datafile import NdjsonWriter  # noqa: E402
+from stub_algolia import synthetic_hit  # noqa: E402
+
+
+def write_catalog(directory: str, n: int) -> None:
+    webinars = [fetch.transform_hit(synthetic_hit(i)) for i in range(n)]
+    with NdjsonWriter(os.path.join(directory, "data.jsonl")) as out:
+        for w in webinars:
+            out.write(w)
+    # Older checkouts only read data.json
+    with open(os.path.join(directory, "data.json"), "w", encoding="utf-8") as f:
+        json.dump({"webinars": webinars}, f, ensure_ascii=False)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=30).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def _client(url: str, stop_at: float) -> Tuple[List[float], int]:
+    session = requests.Session()
+    latencies: List[float] = []
+    errors = 0
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        r = session.get(url, headers={"Accept-Encoding": "gzip"}, timeout=30)
+        if r.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+    return (latencies, errors)
+
+
+def hammer(url: str, clients: int, duration: float) -> Dict[str, Any]:
+    # One process per client: a single Python load generator tops out
+    # well below what a few gunicorn workers can serve
+    stop_at = time.time() + duration
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.starmap(_client, [(url, stop_at)] * clients)
+
+    latencies = sorted(lat for lats, _ in results for lat in lats)
+    errors = sum(e for _, e in results)
+    pct = lambda p: round(latencies[int(p * (len(latencies) - 1))] * 1000, 2)  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": pct(0.5) if latencies else None,
+        "p99_ms": pct(0.99) if latencies else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GET / throughput under gunicorn")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--app-dir", default=REPO_DIR, help="checkout to serve")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8, help="client processes")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--toggle-every",
+        type=float,
+        default=0.0,
+        help="also toggle a watched flag every N seconds (0 = read-only)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_catalog(tmp, args.records)
+        port = free_port()
+        url = f"http://127.0.0.1:{port}/"
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn",
+                "-w", str(args.workers),
+                "-b", f"127.0.0.1:{port}",
+                "--chdir", tmp,
+                "--pythonpath", os.path.abspath(args.app_dir),
+                "--log-level", "warning",
+                "app:app",
+            ],
+            env={k: v for k, v in os.environ.items() if k != "WEBINARHUNT_STORAGE"},
+        )
+        try:
+            wait_ready(url)
+            # Let every worker load the catalog before timing
+            hammer(url, args.workers * 2, 2.0)
+
+            stop = threading.Event()
+
+            def toggler() -> None:
+                watched = True
+                while not stop.wait(args.toggle_every):
+                    requests.post(
+                        f"{url}api/toggle-watched",
+                        json={"webcastId": "100000", "watched": watched},
+                        timeout=30,
+                    )
+                    watched = not watched
+
+            if args.toggle_every > 0:
+                threading.Thread(target=toggler, daemon=True).start()
+            result = hammer(url, args.clients, args.duration)
+            stop.set()
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(
+        json.dumps(
+            {
+                "app_dir": os.path.abspath(args.app_dir),
+                "records": args.records,
+                "workers": args.workers,
+                "clients": args.clients,
+                "toggle_every": args.toggle_every,
+                **result,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
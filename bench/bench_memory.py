@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# bench/bench_memory.py
+#
+# Peak memory of writing and reading the dataset: the old path (collect a
+# list, json.dump the {"webinars": [...]} document, json.load it back) vs
+# the streaming one (NdjsonWriter / iter_records). Each mode runs in its own
+# subprocess so ru_maxrss isn't shared between them.
+#
+#   python bench/bench_memory.py --records 20000
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetch  # noqa: E402
+from datafile import NdjsonWriter, iter_records  # noqa: E402
+from stub_algolia import synthetic_hit  # noqa: E402
+
+
+def transformed(n: int) -> Any:
+    return (fetch.transform_hit(synthetic_hit(i)) for i in range(n))
+
+
+def run_legacy(n: int, path: str) -> int:
+    webinars = list(transformed(n))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"webinars": webinars}, f, indent=2, ensure_ascii=False)
+    del webinars
+    with open(path, "r", encoding="utf-8") as f:
+        return len(json.load(f)["webinars"])
+
+
+def run_streaming(n: int, path: str) -> int:
+    with NdjsonWriter(path) as out:
+        for w in transformed(n):
+            out.write(w)
+    return sum(1 for _ in iter_records(path))
+
+
+MODES = {"legacy": (run_legacy, "data.json"), "streaming": (run_streaming, "data.jsonl")}
+
+
+def measure(mode: str, n: int) -> Dict[str, Any]:
+    run, filename = MODES[mode]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, filename)
+        tracemalloc.start()
+        start = time.perf_counter()
+        count = run(n, path)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = os.path.getsize(path)
+    return {
+        "records": count,
+        "seconds": round(elapsed, 2),
+        "file_mb": round(size / 2**20, 1),
+        "tracemalloc_peak_mb": round(peak / 2**20, 1),
+        # KiB on Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dataset write/read peak memory")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--mode", choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.records)))
+        return
+
+    results: Dict[str, Any] = {"records": args.records}
+    for mode in ("legacy", "streaming"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--records", str(args.records), "--mode", mode],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[mode] = json.loads(out)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
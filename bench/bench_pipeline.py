@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# bench/bench_pipeline.py
+#
+# fetch.py's fetch -> transform pipeline against the local stub, with the
+# transform inline vs on a process pool: wall time, throughput, busy time
+# per stage and queue depths. Each worker count runs in its own subprocess.
+#
+#   python bench/bench_pipeline.py --hits 20000 --latency 0.05 --workers 0,1,2
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fetch  # noqa: E402
+from pipeline import PipelineStats, pipeline_stats_dict  # noqa: E402
+from stub_algolia import StubAlgolia, serve_in_background  # noqa: E402
+
+
+def measure(hits: int, latency: float, workers: int, concurrency: int) -> Dict[str, Any]:
+    server, url = serve_in_background(StubAlgolia(hits, latency=latency))
+    fetch.API_URL = url
+    stats = PipelineStats()
+    try:
+        pages = fetch.iter_pages(int(time.time()), concurrency=concurrency)
+        # Drain without writing: this times fetching and tagging only
+        for _ in fetch.iter_transformed(pages, workers, stats):
+            pass
+    finally:
+        server.shutdown()
+    return pipeline_stats_dict(stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="fetch.py pipeline, inline vs process pool")
+    parser.add_argument("--hits", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per request")
+    parser.add_argument("--concurrency", type=int, default=fetch.DEFAULT_CONCURRENCY)
+    parser.add_argument("--workers", default="0,1,2", help="comma-separated worker counts")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one is not None:
+        print(json.dumps(measure(args.hits, args.latency, args.one, args.concurrency)))
+        return
+
+    results: Dict[str, Any] = {
+        "hits": args.hits,
+        "latency_s": args.latency,
+        "concurrency": args.concurrency,
+        "cpus": os.cpu_count(),
+        "runs": [],
+    }
+    for workers in (int(w) for w in args.workers.split(",")):
+        out = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--one",
+                str(workers),
+                "--hits",
+                str(args.hits),
+                "--latency",
+                str(args.latency),
+                "--concurrency",
+                str(args.concurrency),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        run = json.loads(out)
+        run["pages_per_s"] = round(run["pages"] / run["wall_s"], 1) if run["wall_s"] else None
+        results["runs"].append(run)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# bench/bench_state.py
+#
+# Toggles per second: legacy full rewrite of state.json vs journal append,
+# and a check that an update applied after a torn journal line survives.
+#
+#   python bench/bench_state.py --entries 5000 --toggles 500
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from statestore import StateStore  # noqa: E402
+
+
+def seed_state(n: int) -> Dict[str, Dict[str, Any]]:
+    return {str(100000 + i): {"watched": i % 2 == 0, "favorite": i % 7 == 0} for i in range(n)}
+
+
+def bench_legacy(path: str, toggles: int) -> float:
+    # What app.py did before the journal: load, mutate one key, dump all
+    start = time.perf_counter()
+    for i in range(toggles):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        st = state.get(str(100000 + i), {})
+        st["watched"] = not st.get("watched", False)
+        state[str(100000 + i)] = st
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, ensure_ascii=False)
+    return time.perf_counter() - start
+
+
+def bench_journal(store: StateStore, toggles: int, batch: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, toggles, batch):
+        store.apply(
+            [(str(100000 + j), {"watched": j % 2 == 1}) for j in range(i, min(i + batch, toggles))]
+        )
+    return time.perf_counter() - start
+
+
+def check_torn_journal(directory: str) -> bool:
+    # A crash mid-append: the journal ends in half a line
+    store = StateStore(os.path.join(directory, "state_torn.json"))
+    store.replace(seed_state(10))
+    store.apply([("100001", {"watched": True}), ("100002", {"favorite": True})])
+    with open(store.journal_path, "r+b") as f:
+        f.truncate(os.path.getsize(store.journal_path) - 10)
+    store.apply([("100003", {"watched": True})])
+    state = store.load()
+    return state["100001"]["watched"] is True and state["100003"]["watched"] is True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="State toggle throughput")
+    parser.add_argument("--entries", type=int, default=5000, help="state entries")
+    parser.add_argument("--toggles", type=int, default=500)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"entries": args.entries, "toggles": args.toggles}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy_state.json")
+        with open(legacy_path, "w", encoding="utf-8") as f:
+            json.dump(seed_state(args.entries), f, indent=2)
+        elapsed = bench_legacy(legacy_path, args.toggles)
+        results["legacy_rewrite_toggles_per_sec"] = round(args.toggles / elapsed, 1)
+
+        for batch in (1, 50):
+            snapshot = os.path.join(tmp, f"state_{batch}.json")
+            store = StateStore(snapshot)
+            store.replace(seed_state(args.entries))
+            elapsed = bench_journal(store, args.toggles, batch)
+            results[f"journal_batch{batch}_toggles_per_sec"] = round(args.toggles / elapsed, 1)
+
+        results["torn_journal_update_kept"] = check_torn_journal(tmp)
+
+    print(json.dumps(results, indent=2))
+    if not results["torn_journal_update_kept"]:
+        sys.exit("update after a torn journal line was lost")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# bench/bench_tagging.py
+#
+# map_cysa_tags: speed of the compiled matcher vs the old per-keyword
+# substring scan, precision/recall on a small hand-labelled corpus, and a
+# fuzz check that it finds exactly what a per-keyword whole-word search
+# finds, overlapping keywords included (exit 1 on any difference).
+#
+#   python bench/bench_tagging.py --docs 5000
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetch  # noqa: E402
+from stub_algolia import synthetic_hit  # noqa: E402
+
+D1_EMAIL = "Security Operations – Email & User-Focused Threats (CySA+ D1)"
+D1_NET = "Security Operations – Network Monitoring (CySA+ D1)"
+D1_TI = "Security Operations – Threat Intelligence (CySA+ D1)"
+D1_SIEM = "Security Operations – SIEM & Log Analysis (CySA+ D1)"
+D2_WEB = "Vulnerability Management – Web & App Security (CySA+ D2)"
+D2_TVM = "Threat & Vulnerability Management (CySA+ D2)"
+D3_FOR = "Incident Response – Digital Forensics (CySA+ D3)"
+D3_MAL = "Incident Response – Malware & Ransomware (CySA+ D3)"
+D3_ATK = "Incident Response – Attack Methodologies (CySA+ D3)"
+D3_POST = "Incident Response – Post-Incident (CySA+ D3)"
+D3_PROC = "Incident Response – Process & Playbooks (CySA+ D3)"
+D4_GOV = "Reporting & Communication – Compliance & Governance (CySA+ D4)"
+D4_STK = "Reporting & Communication – Stakeholder Communication (CySA+ D4)"
+
+# (text, tags a human would assign)
+CORPUS: List[Tuple[str, Set[str]]] = [
+    ("Keeping kids safe online: tips for parents", set()),
+    ("Because it matters: career advice for new analysts", set()),
+    ("Tips and tricks for better slide decks", set()),
+    ("Onboarding new hires: ideas that stick", set()),
+    ("How we rebuilt our keyboard shortcuts", set()),
+    ("Deploying IDS and IPS sensors at the network edge", {D1_NET}),
+    ("Stopping BEC: business email compromise in 2024", {D1_EMAIL}),
+    ("Phishing simulations that actually change behavior", {D2_TVM}),
+    ("Tracking APT groups with threat intelligence feeds", {D1_TI}),
+    ("Adapting the MITRE ATT&CK framework for detection", {D1_TI, D3_ATK}),
+    ("Memory forensics for ransomware investigations", {D3_FOR, D3_MAL}),
+    ("Splunk dashboards for the SOC", {D1_SIEM, "Reporting & Communication – Metrics & KPIs (CySA+ D4)"}),
+    ("Finding SQL injection and XSS in legacy apps", {D2_WEB}),
+    ("Briefing the board on cyber risk", {D4_STK}),
+    ("GDPR and HIPAA audits without the pain", {D4_GOV}),
+    ("Snapshots, backups and capacity planning", set()),
+    ("Rapid prototyping with spreadsheets", set()),
+    ("Ships, ports and supply chains", set()),
+    ("Decoding the CEO inbox: whaling and BEC fraud", {D1_EMAIL}),
+    ("Ambidextrous leadership for hybrid teams", set()),
+    # One keyword starting inside another: both count
+    ("Post-incident response: what to write down", {D3_POST, D3_PROC}),
+    ("Running post-incident response reviews", {D3_POST, D3_PROC}),
+]
+
+
+def legacy_map_cysa_tags(title: str, description: str = "") -> List[str]:
+    # The pre-compiled-matcher implementation: substring test per keyword
+    text = f"{title or ''} {description or ''}".lower()
+    return sorted({tag for kw, tag in fetch.CYSA_KEYWORD_MAP.items() if kw in text})
+
+
+def whole_word_map_cysa_tags(title: str, description: str = "") -> List[str]:
+    # Reference for the compiled matcher: one whole-word search per keyword
+    text = f"{title or ''} {description or ''}".lower()
+    return sorted(
+        {
+            tag
+            for kw, tag in fetch.CYSA_KEYWORD_MAP.items()
+            if re.search(fetch._WORD_START + re.escape(kw.strip()) + fetch._WORD_END, text)
+        }
+    )
+
+
+def fuzz_texts(n: int, seed: int = 0) -> List[str]:
+    # Keywords glued together, half the time overlapping: the next one
+    # starts at a word inside the previous one ("post-incident" +
+    # "incident response" -> "post-incident response")
+    rng = random.Random(seed)
+    keywords = sorted({kw.strip() for kw in fetch.CYSA_KEYWORD_MAP})
+    overlaps: Dict[str, List[Tuple[int, str]]] = {}
+    for kw in keywords:
+        for i in range(1, len(kw)):
+            if kw[i - 1].isalnum() or not kw[i].isalnum():
+                continue
+            for other in keywords:
+                if len(other) > len(kw) - i and other.startswith(kw[i:]):
+                    overlaps.setdefault(kw, []).append((len(kw) - i, other))
+    texts = []
+    for _ in range(n):
+        kw = rng.choice(keywords)
+        text = kw
+        for _ in range(rng.randint(0, 3)):
+            if kw in overlaps and rng.random() < 0.5:
+                shared, kw = rng.choice(overlaps[kw])
+                text += kw[shared:]
+            else:
+                kw = rng.choice(keywords)
+                text += rng.choice([" ", "-", "s ", ", "]) + kw
+        texts.append(text)
+    return texts
+
+
+def score(tagger: Any) -> Dict[str, int]:
+    tp = fp = fn = 0
+    for text, expected in CORPUS:
+        got = set(tagger(text, ""))
+        tp += len(got & expected)
+        fp += len(got - expected)
+        fn += len(expected - got)
+    return {"true_positives": tp, "false_positives": fp, "false_negatives": fn}
+
+
+def time_per_doc(tagger: Any, docs: List[Tuple[str, str]]) -> float:
+    start = time.perf_counter()
+    for title, description in docs:
+        tagger(title, description)
+    return (time.perf_counter() - start) / len(docs) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CySA+ tagging speed and precision")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--fuzz", type=int, default=20000, help="random overlapping texts")
+    args = parser.parse_args()
+
+    docs = [(h["title"], h["description"]) for h in map(synthetic_hit, range(args.docs))]
+
+    # Compile outside the timed loop, as a long-running fetch would
+    fetch.map_cysa_tags("", "")
+
+    results = {
+        "docs": args.docs,
+        "legacy_us_per_doc": round(time_per_doc(legacy_map_cysa_tags, docs), 2),
+        "compiled_us_per_doc": round(time_per_doc(fetch.map_cysa_tags, docs), 2),
+        "legacy_corpus": score(legacy_map_cysa_tags),
+        "compiled_corpus": score(fetch.map_cysa_tags),
+    }
+    texts = fuzz_texts(args.fuzz)
+    mismatches = [t for t in texts if fetch.map_cysa_tags(t) != whole_word_map_cysa_tags(t)]
+    results["fuzz_texts"] = len(texts)
+    results["fuzz_mismatches"] = mismatches[:10]
+    print(json.dumps(results, indent=2))
+    if mismatches:
+        sys.exit(f"{len(mismatches)} fuzz texts tagged differently from the whole-word reference")
+    if results["compiled_corpus"]["false_negatives"]:
+        sys.exit("compiled matcher missed tags in the corpus")
+
+
+if __name__ == "__main__":
+    main()
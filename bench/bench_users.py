@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# bench/bench_users.py
+#
+# Per-user state shards: what one user's toggle costs (journal append,
+# then the re-merge and first relevance-sorted page it triggers) as more
+# users with their own state share the instance, next to a full merge of
+# everyone's state as one file. Each user count runs in its own subprocess.
+#
+#   python bench/bench_users.py --records 10000 --entries 500 --users 1,10,50
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fetch  # noqa: E402
+from datafile import DATA_FILE, NdjsonWriter  # noqa: E402
+from query import WebinarQuery  # noqa: E402
+from stub_algolia import synthetic_hit  # noqa: E402
+
+
+def write_dataset(directory: str, n: int) -> None:
+    with NdjsonWriter(os.path.join(directory, DATA_FILE)) as out:
+        for i in range(n):
+            out.write(fetch.transform_hit(synthetic_hit(i)))
+
+
+def measure(directory: str, users: int, entries: int, toggles: int) -> Dict[str, Any]:
+    os.chdir(directory)
+    import app  # after chdir: its file paths are relative
+
+    ids = [str(w["webcastId"]) for w in app.load_data()]
+    everyone: Dict[str, Dict[str, Any]] = {}
+    for u in range(users):
+        state = {
+            ids[(u * 7919 + i) % len(ids)]: {"watched": i % 2 == 0, "favorite": i % 5 == 0}
+            for i in range(entries)
+        }
+        app.save_state(state, f"user{u}")
+        for webcast_id, st in state.items():
+            everyone.setdefault(webcast_id, {}).update(st)
+
+    query = WebinarQuery(sort="relevance")
+    for u in range(users):
+        app.catalog_cache.view(f"user{u}").query(query)
+
+    start = time.perf_counter()
+    for i in range(toggles):
+        app.update_state([(ids[i], {"watched": i % 2 == 0})], "user0")
+        app.catalog_cache.view("user0").query(query)
+    toggle_s = (time.perf_counter() - start) / toggles
+
+    data = app.load_data()
+    start = time.perf_counter()
+    app.merge_webinars_with_state(data, everyone)
+    single_file_s = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "toggle_and_page_ms": round(toggle_s * 1000, 2),
+        "merge_everyone_as_one_file_ms": round(single_file_s * 1000, 1),
+        "everyone_state_entries": len(everyone),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Toggle cost with per-user state shards")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--entries", type=int, default=500, help="state entries per user")
+    parser.add_argument("--users", default="1,10,50", help="comma-separated user counts")
+    parser.add_argument("--toggles", type=int, default=50)
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one is not None:
+        print(json.dumps(measure(args.dir, args.one, args.entries, args.toggles)))
+        return
+
+    results: Dict[str, Any] = {"records": args.records, "entries_per_user": args.entries, "runs": []}
+    for users in (int(u) for u in args.users.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_dataset(tmp, args.records)
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--one",
+                    str(users),
+                    "--dir",
+                    tmp,
+                    "--entries",
+                    str(args.entries),
+                    "--toggles",
+                    str(args.toggles),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+                env={k: v for k, v in os.environ.items() if k != "WEBINARHUNT_STORAGE"},
+            ).stdout
+            results["runs"].append(json.loads(out))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# bench/load_test.py
+#
+# Hundreds of concurrent clients mixing paged catalog reads and toggles,
+# against gunicorn sync workers (wsgi) or a single uvicorn process (asgi):
+#
+#   python bench/load_test.py --server wsgi --clients 200
+#   python bench/load_test.py --server asgi --clients 200
+#
+# The clients are asyncio tasks on keep-alive connections, so one process
+# can hold hundreds of them open; "errors" counts non-2xx answers and
+# dropped connections.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_index import free_port, wait_ready, write_catalog  # noqa: E402
+
+PAGE_SIZE = 30
+
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client; reconnects when the server closes."""
+
+    def __init__(self, port: int) -> None:
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> int:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection("127.0.0.1", self.port)
+        assert self._reader is not None
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept-Encoding: gzip\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        )
+        self._writer.write(head.encode("latin-1") + body)
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("closed")
+        status = int(status_line.split()[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self._reader.readexactly(int(headers.get("content-length", "0")))
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+async def client(
+    port: int, records: int, toggle_ratio: float, stop_at: float, seed: int
+) -> Dict[str, List[Any]]:
+    rng = random.Random(seed)
+    conn = Connection(port)
+    results: Dict[str, List[Any]] = {"read": [], "toggle": []}
+    while time.monotonic() < stop_at:
+        if rng.random() < toggle_ratio:
+            kind, method = "toggle", "POST"
+            path = "/api/toggle-watched"
+            body = json.dumps(
+                {"webcastId": str(100000 + rng.randrange(records)), "watched": rng.random() < 0.5}
+            ).encode("utf-8")
+        else:
+            kind, method, body = "read", "GET", b""
+            page = rng.randrange(max(1, records // PAGE_SIZE))
+            path = f"/api/webinars?offset={page * PAGE_SIZE}&limit={PAGE_SIZE}"
+        start = time.perf_counter()
+        try:
+            ok = 200 <= await conn.request(method, path, body) < 300
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            conn.close()
+            ok = False
+        results[kind].append(time.perf_counter() - start if ok else None)
+    conn.close()
+    return results
+
+
+def summarize(samples: List[Optional[float]], duration: float) -> Dict[str, Any]:
+    latencies = sorted(s for s in samples if s is not None)
+    pct = lambda p: round(latencies[int(p * (len(latencies) - 1))] * 1000, 2)  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "errors": len(samples) - len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": pct(0.5) if latencies else None,
+        "p99_ms": pct(0.99) if latencies else None,
+    }
+
+
+async def run_load(
+    port: int, records: int, clients: int, toggle_ratio: float, duration: float
+) -> Dict[str, Any]:
+    stop_at = time.monotonic() + duration
+    results = await asyncio.gather(
+        *(client(port, records, toggle_ratio, stop_at, seed) for seed in range(clients))
+    )
+    return {
+        kind: summarize([s for r in results for s in r[kind]], duration)
+        for kind in ("read", "toggle")
+    }
+
+
+def server_command(kind: str, port: int, app_dir: str, workers: int) -> List[str]:
+    if kind == "asgi":
+        return [
+            sys.executable, "-m", "uvicorn", "asgi:app",
+            "--app-dir", app_dir,
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning",
+        ]
+    return [
+        sys.executable, "-m", "gunicorn",
+        "-w", str(workers),
+        "-b", f"127.0.0.1:{port}",
+        "--pythonpath", app_dir,
+        "--log-level", "warning",
+        "app:app",
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent reads + toggles, wsgi vs asgi")
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="asgi")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--app-dir", default=REPO_DIR, help="checkout to serve")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers (wsgi)")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent connections")
+    parser.add_argument("--toggle-ratio", type=float, default=0.2, help="share of requests that toggle")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_catalog(tmp, args.records)
+        port = free_port()
+        server = subprocess.Popen(
+            server_command(args.server, port, os.path.abspath(args.app_dir), args.workers),
+            cwd=tmp,
+            env={k: v for k, v in os.environ.items() if k != "WEBINARHUNT_STORAGE"},
+        )
+        try:
+            wait_ready(f"http://127.0.0.1:{port}/api/webinars?limit=1")
+            # Warm up: every worker loads the catalog before timing
+            asyncio.run(run_load(port, args.records, args.workers * 2, 0.0, 2.0))
+            result = asyncio.run(
+                run_load(port, args.records, args.clients, args.toggle_ratio, args.duration)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(
+        json.dumps(
+            {
+                "server": args.server,
+                "app_dir": os.path.abspath(args.app_dir),
+                "records": args.records,
+                "workers": args.workers if args.server == "wsgi" else 1,
+                "clients": args.clients,
+                "toggle_ratio": args.toggle_ratio,
+                **result,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# bench/run_suite.py
+#
+# Regression suite: times the hot paths of fetch.py and app.py against
+# synthetic catalogs of several sizes and prints one JSON document, so two
+# commits can be compared run against run:
+#
+#   python bench/run_suite.py --out before.json   # on the old commit
+#   python bench/run_suite.py --out after.json
+#   python bench/run_suite.py --sizes 1000 --repeat 3   # quick check
+#
+# Each catalog size runs in its own subprocess (fresh caches, own
+# ru_maxrss) inside a scratch directory holding data.jsonl and state.json.
+# Times are the best of --repeat runs, in milliseconds unless the key
+# says otherwise.
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fetch  # noqa: E402
+from columnar import COLUMNAR_FILE, ColumnarWriter  # noqa: E402
+from datafile import NdjsonWriter, iter_records  # noqa: E402
+from stub_algolia import StubAlgolia, serve_in_background, synthetic_hit  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def write_fixtures(directory: str, n: int) -> None:
+    """data.jsonl and data.columns as fetch.py writes them, plus state for every 10th webinar."""
+    data_path = os.path.join(directory, "data.jsonl")
+    with NdjsonWriter(data_path) as out:
+        for i in range(n):
+            out.write(fetch.transform_hit(synthetic_hit(i)))
+    with ColumnarWriter(os.path.join(directory, COLUMNAR_FILE), data_path) as columns:
+        for w in iter_records(data_path):
+            columns.write(w)
+    state = {
+        str(100_000 + i): {"watched": i % 20 == 0, "favorite": i % 30 == 0}
+        for i in range(0, n, 10)
+    }
+    with open(os.path.join(directory, "state.json"), "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+def bench_tagging(n: int, repeat: int) -> Dict[str, Any]:
+    docs = [(h["title"], h["description"]) for h in map(synthetic_hit, range(min(n, 10000)))]
+    fetch.map_cysa_tags("", "")  # compile outside the timed loop
+
+    def tag_all() -> None:
+        for title, description in docs:
+            fetch.map_cysa_tags(title, description)
+
+    return {"map_cysa_tags_us_per_doc": round(best_ms(tag_all, repeat) * 1000 / len(docs), 3)}
+
+
+def bench_app(n: int, repeat: int, toggles: int) -> Dict[str, Any]:
+    # Imported here: app.py's stores resolve their paths against the cwd
+    import app
+    from markupsafe import Markup
+
+    from query import CatalogView, WebinarQuery
+
+    webinars = app.load_data()
+    merged = app.merge_data_and_state()
+
+    def sort_and_render() -> None:
+        # The cold path of GET /: sort the merged catalog, render the page
+        view = CatalogView(merged)
+        page = app.json_bytes(view.query(WebinarQuery())).decode("utf-8")
+        with app.app.test_request_context("/"):
+            app.render_template(
+                "index.html", initial_page_json=Markup(page), user=app.DEFAULT_USER
+            )
+
+    results: Dict[str, Any] = {
+        "load_data_ms": best_ms(app.load_data, repeat),
+        "merge_data_and_state_ms": best_ms(app.merge_data_and_state, repeat),
+        "build_objectid_to_webcastid_map_ms": best_ms(
+            lambda: app.build_objectid_to_webcastid_map(webinars), repeat
+        ),
+        "index_sort_render_ms": best_ms(sort_and_render, repeat),
+    }
+
+    client = app.app.test_client()
+    results["index_first_get_ms"] = best_ms(lambda: client.get("/"), 1)
+    results["index_get_ms"] = best_ms(lambda: client.get("/"), repeat)
+    results["api_webinars_page_ms"] = best_ms(
+        lambda: client.get("/api/webinars?sort=title&offset=60&limit=30"), repeat
+    )
+
+    def toggle(i: int, flag: str) -> None:
+        webcast_id = str(100_000 + (i * 7919) % n)
+        r = client.post(f"/api/toggle-{flag}", json={"webcastId": webcast_id, flag: i % 2 == 0})
+        assert r.status_code == 200, r.get_data(as_text=True)
+
+    for flag in ("watched", "favorite"):
+        start = time.perf_counter()
+        for i in range(toggles):
+            toggle(i, flag)
+        elapsed = time.perf_counter() - start
+        results[f"toggle_{flag}_ms"] = round(elapsed / toggles * 1000, 3)
+
+    batch = {"updates": [{"webcastId": str(100_000 + i), "watched": True} for i in range(100)]}
+    results["state_batch_100_ms"] = best_ms(lambda: client.post("/api/state/batch", json=batch), repeat)
+    return results
+
+
+def bench_fetch_page(n: int, repeat: int) -> Dict[str, Any]:
+    # Only as many hits as the pages fetched: the stub filters its whole
+    # list per request, which would otherwise dominate at 100k
+    pages = min(50, (n + 99) // 100)
+    stub = StubAlgolia(n_hits=min(n, pages * 100))
+    server, url = serve_in_background(stub)
+    fetch.API_URL = url
+    try:
+        session = fetch.requests.Session()
+        before = int(time.time()) + 86_400 * 365 * 100
+
+        def fetch_pages() -> None:
+            for page in range(pages):
+                fetch.fetch_page(session, page, before)
+
+        seconds = best_ms(fetch_pages, repeat) / 1000
+    finally:
+        server.shutdown()
+    return {"fetch_page_pages_per_sec": round(pages / seconds, 1)}
+
+
+def measure(n: int, repeat: int, toggles: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"records": n}
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_fixtures(tmp, n)
+        results["write_fixtures_s"] = round(time.perf_counter() - start, 2)
+        os.chdir(tmp)
+        results.update(bench_tagging(n, repeat))
+        results.update(bench_app(n, repeat, toggles))
+        results.update(bench_fetch_page(n, repeat))
+        os.chdir(REPO_DIR)
+    # KiB on Linux
+    results["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return out.stdout.strip()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Timing suite for fetch.py and app.py")
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma-separated catalog sizes (default 1000,10000,100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timing (best is kept)")
+    parser.add_argument("--toggles", type=int, default=20, help="toggle requests per flag")
+    parser.add_argument("--out", help="also write the JSON here")
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size:
+        print(json.dumps(measure(args.size, args.repeat, args.toggles)))
+        return
+
+    runs: List[Dict[str, Any]] = []
+    for n in args.sizes:
+        out = subprocess.run(
+            [
+                sys.executable, __file__,
+                "--size", str(n),
+                "--repeat", str(args.repeat),
+                "--toggles", str(args.toggles),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+            env={k: v for k, v in os.environ.items() if k != "WEBINARHUNT_STORAGE"},
+        ).stdout
+        runs.append(json.loads(out))
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "runs": runs,
+    }
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# bench/smoke_index.py
+#
+# Front-end smoke check: GET / against a synthetic catalog, then run the
+# page's own scripts in node and evaluate every Alpine binding of the
+# component (x-text, x-show, x-if, x-for, :attr, x-model; @handlers are
+# only compiled) the way Alpine would for the cards it renders first.
+# Fails on any expression that throws (e.g. an undefined helper), and on
+# missing or duplicate card keys. Needs node; no browser or npm packages.
+#
+#   python bench/smoke_index.py --records 200
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fetch  # noqa: E402
+from datafile import DATA_FILE, NdjsonWriter  # noqa: E402
+from stub_algolia import synthetic_hit  # noqa: E402
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source"}
+
+# Minimal Alpine: scopes are the component plus x-for variables; names
+# found in neither fall through to the page's globals, so an undefined one
+# throws a ReferenceError just as in the browser.
+NODE_SCRIPT = r"""
+const vm = require('vm');
+const { scripts, root } = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+
+const noop = () => {};
+const ctx = {
+    console: { log: noop, warn: noop, error: noop },
+    setTimeout: noop, clearTimeout: noop, requestAnimationFrame: noop,
+    IntersectionObserver: class { observe() {} },
+    document: { addEventListener: noop, visibilityState: 'visible' },
+    innerWidth: 1280, innerHeight: 800, addEventListener: noop,
+    fetch: () => new Promise(noop),
+};
+vm.createContext(ctx);
+vm.runInContext('var window = globalThis;', ctx);
+scripts.forEach(code => vm.runInContext(code, ctx));
+
+const attr = (node, name) => (node.attrs.find(a => a[0] === name) || [])[1];
+const component = vm.runInContext(`(${attr(root, 'x-data')})`, ctx);
+Object.assign(component, { $refs: {}, $nextTick: noop, $watch: noop, $el: null });
+
+const errors = new Map();
+const compile = vm.runInContext(
+    '(expr) => new Function("__scope", "with (__scope) { return (" + expr + "); }")', ctx);
+function evaluate(expr, locals, where)
+{
+    const scope = new Proxy({}, {
+        has: (_, key) => key in locals || key in component,
+        get: (_, key) => key in locals ? locals[key] : component[key],
+    });
+    try
+    {
+        return compile(expr).call(component, scope);
+    } catch (err)
+    {
+        errors.set(`${where}="${expr}": ${err.name}: ${err.message}`, true);
+        return undefined;
+    }
+}
+
+let cards = 0;
+const keys = [];
+function walk(node, locals)
+{
+    const loop = attr(node, 'x-for');
+    if (loop)
+    {
+        const [, name, source] = loop.match(/^\s*(\w+)\s+in\s+([\s\S]+)$/);
+        const items = evaluate(source, locals, 'x-for') || [];
+        for (const item of items)
+        {
+            const inner = { ...locals, [name]: item };
+            const key = evaluate(attr(node, ':key'), inner, ':key');
+            if (source.trim() === 'visible')
+            {
+                cards += 1;
+                keys.push(key);
+            }
+            node.children.forEach(child => walk(child, inner));
+        }
+        return;
+    }
+    const cond = attr(node, 'x-if');
+    if (cond !== undefined && !evaluate(cond, locals, 'x-if')) return;
+    for (const [name, value] of node.attrs)
+    {
+        if (name.startsWith('@') || name.startsWith('x-on:'))
+        {
+            try { compile(value); } catch (err) { errors.set(`${name}="${value}": ${err.message}`, true); }
+        } else if (name.startsWith(':') || ['x-text', 'x-show', 'x-html', 'x-model'].includes(name))
+        {
+            evaluate(value, locals, name);
+        }
+    }
+    node.children.forEach(child => walk(child, locals));
+}
+walk({ attrs: [], children: root.children }, {});
+
+process.stdout.write(JSON.stringify({
+    cards,
+    keys_ok: keys.every(k => typeof k === 'string' && k !== '') && new Set(keys).size === keys.length,
+    errors: [...errors.keys()],
+}));
+"""
+
+
+class _Node:
+    def __init__(self, tag: str, attrs: List[List[str]]) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List["_Node"] = []
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "tag": self.tag,
+            "attrs": self.attrs,
+            "children": [c.to_json() for c in self.children],
+        }
+
+
+class _PageParser(HTMLParser):
+    # The element tree under x-data, plus every inline <script>
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.stack: List[_Node] = [_Node("#document", [])]
+        self.scripts: List[str] = []
+        self._in_script = False
+
+    def handle_starttag(self, tag: str, attrs: List[Any]) -> None:
+        node = _Node(tag, [[name, value or ""] for name, value in attrs])
+        self.stack[-1].children.append(node)
+        if tag == "script":
+            self._in_script = not any(name == "src" for name, _ in attrs)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "script":
+            self._in_script = False
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._in_script and data.strip():
+            self.scripts.append(data)
+
+
+def _find_component(node: _Node) -> Optional[_Node]:
+    if any(name == "x-data" for name, _ in node.attrs):
+        return node
+    for child in node.children:
+        found = _find_component(child)
+        if found is not None:
+            return found
+    return None
+
+
+def check_page(html: str) -> Dict[str, Any]:
+    parser = _PageParser()
+    parser.feed(html)
+    root = _find_component(parser.stack[0])
+    if root is None:
+        return {"cards": 0, "keys_ok": False, "errors": ["no x-data component in the page"]}
+    out = subprocess.run(
+        ["node", "-e", NODE_SCRIPT],
+        input=json.dumps({"scripts": parser.scripts, "root": root.to_json()}),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render / and evaluate its Alpine bindings")
+    parser.add_argument("--records", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with NdjsonWriter(os.path.join(tmp, DATA_FILE)) as out:
+            for i in range(args.records):
+                out.write(fetch.transform_hit(synthetic_hit(i)))
+        os.chdir(tmp)
+        import app  # after chdir: its file paths are relative
+
+        response = app.app.test_client().get("/")
+        results: Dict[str, Any] = {"records": args.records, "status": response.status_code}
+        results.update(check_page(response.get_data(as_text=True)))
+
+    print(json.dumps(results, indent=2))
+    if response.status_code != 200 or results["errors"] or not results["cards"]:
+        sys.exit("index page smoke check failed")
+    if not results["keys_ok"]:
+        sys.exit("card keys missing or not unique")
+
+
+if __name__ == "__main__":
+    main()
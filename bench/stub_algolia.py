@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# bench/stub_algolia.py
+#
+# Local stand-in for the SANS Algolia proxy: serves deterministic
+# synthetic hits with optional latency and injected 429 errors.
+#
+#   python bench/stub_algolia.py --port 8765 --hits 2500 --latency 0.2
+#   WEBINARHUNT_API_URL=http://127.0.0.1:8765/ python fetch.py
+
+import argparse
+import json
+import operator
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_TS = 1_600_000_000
+
+# Longest first so ">=" isn't read as ">"
+_NUMERIC_OPS = (
+    (">=", operator.ge),
+    ("<=", operator.le),
+    (">", operator.gt),
+    ("<", operator.lt),
+)
+
+_WORDS = (
+    "threat hunting siem splunk incident response ransomware forensics cloud "
+    "kubernetes zero trust phishing vulnerability management metrics board "
+    "detection engineering purple team ics ot security awareness ai llm"
+).split()
+
+
+def synthetic_hit(i: int) -> Dict[str, Any]:
+    """Hit shaped like the real Algolia response, stable for a given i."""
+    rng = random.Random(i)
+    start = BASE_TS + i * 86_400
+    duration = rng.choice([1800, 3600, 3600, 5400, 7200, 10800, 14400])
+    title = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))).title()
+    description = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 80)))
+    return {
+        "objectID": f"webcast-{i}",
+        "webcastId": str(100_000 + i),
+        "title": title,
+        "url": f"/webcasts/{100_000 + i}",
+        "description": description,
+        "startDate": time.strftime("%Y-%m-%d", time.gmtime(start)),
+        "startTime": "13:00",
+        "endDate": time.strftime("%Y-%m-%d", time.gmtime(start + duration)),
+        "endTime": "14:00",
+        "startDateTimestamp": start,
+        "endDateTimestamp": start + duration,
+        "type": "webcast",
+        "facets": {"focusArea": [rng.choice(["Cyber Defense", "Cloud Security", "DFIR"])]},
+        "language": ["English"],
+        "createdAt": time.strftime("%Y-%m-%d", time.gmtime(start - 30 * 86_400)),
+        "createdAtTimestamp": start - 30 * 86_400,
+        "updatedAt": time.strftime("%Y-%m-%d", time.gmtime(start)),
+        "updatedAtTimestamp": start,
+    }
+
+
+class StubAlgolia:
+    def __init__(
+        self,
+        n_hits: int = 1000,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.hits = [synthetic_hit(i) for i in range(n_hits)]
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def respond(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            return (429, {"message": "Too many requests"})
+
+        params = body["requests"][0]["params"]
+        per_page = int(params.get("hitsPerPage", 100))
+        page = int(params.get("page", 0))
+        matching = self.filter_hits(params.get("numericFilters") or [])
+        nb_pages = (len(matching) + per_page - 1) // per_page
+        hits = matching[page * per_page : (page + 1) * per_page]
+        return (
+            200,
+            {"results": [{"hits": hits, "nbHits": len(matching), "nbPages": nb_pages, "page": page}]},
+        )
+
+    def filter_hits(self, numeric_filters: List[str]) -> List[Dict[str, Any]]:
+        # Supports the "field<value" / "field>value" / ">=" forms fetch.py sends
+        out = self.hits
+        for flt in numeric_filters:
+            for symbol, op in _NUMERIC_OPS:
+                if symbol in flt:
+                    field, value = flt.split(symbol, 1)
+                    v = float(value)
+                    out = [h for h in out if op(h.get(field, 0), v)]
+                    break
+        return out
+
+
+def make_server(stub: StubAlgolia, port: int = 0) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            length = int(self.headers.get("content-length", 0))
+            status, payload = stub.respond(json.loads(self.rfile.read(length)))
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            if status == 429:
+                self.send_header("retry-after", "0")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+
+def serve_in_background(stub: StubAlgolia) -> Tuple[ThreadingHTTPServer, str]:
+    """Start on a free port; returns (server, url). Call server.shutdown()."""
+    server = make_server(stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return (server, f"http://127.0.0.1:{server.server_address[1]}/")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stub Algolia endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--hits", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 429s")
+    args = parser.parse_args(argv)
+
+    server = make_server(StubAlgolia(args.hits, args.latency, args.error_rate), args.port)
+    print(f"Stub Algolia on http://127.0.0.1:{args.port}/ ({args.hits} hits)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
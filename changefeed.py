@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# changefeed.py
+#
+# Versioned change log behind /api/changes. fetch.py logs the webinars it
+# added, changed or removed, app.py logs every state toggle, and each entry
+# gets the next version number. A browser that last synced at version N
+# asks for what changed after N and patches its local copy instead of
+# downloading the whole catalog again.
+#
+# changes.jsonl: a header line {"epoch": "..."} then one entry per line,
+# {"v": 12, "kind": "webinar" | "state", "id": "<webcastId>"} plus
+# "deleted": true for removed webinars. The epoch changes whenever the log
+# is recreated from scratch, so clients can tell their version is from
+# another log. Compaction keeps only the newest entry per (kind, id),
+# which still answers "what changed after N" for every N.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from statestore import FileLock, atomic_write_bytes, atomic_write_json
+
+CHANGES_FILE = "changes.jsonl"
+DIGESTS_FILE = "changes.digests.json"  # webcastId -> record digest at the last fetch
+
+KIND_WEBINAR = "webinar"
+KIND_STATE = "state"
+
+# Rewrite the log without superseded entries once it gets this big
+DEFAULT_COMPACT_BYTES = 2 * 1024 * 1024
+
+# How often each process checks the log for entries from other processes
+DEFAULT_POLL_INTERVAL = 0.5
+
+Entry = Tuple[int, str, str, bool]  # (version, kind, webcastId, deleted)
+
+
+def record_digest(w: Dict[str, Any]) -> str:
+    text = json.dumps(w, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ChangeSet:
+    """What changed after some version, newest entry per id."""
+
+    def __init__(self, version: int) -> None:
+        self.version = version
+        self.webinars: Set[str] = set()
+        self.removed: Set[str] = set()
+        self.state: Set[str] = set()
+
+
+class ChangeFeed:
+    def __init__(
+        self,
+        path: str = CHANGES_FILE,
+        digests_path: str = DIGESTS_FILE,
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+    ) -> None:
+        self.path = path
+        self.digests_path = digests_path
+        self.lock_path = f"{path}.lock"
+        self.compact_bytes = compact_bytes
+        # Parsed copy of the log; appends are read incrementally
+        self._lock = threading.Lock()
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._epoch = ""
+        self._versions: List[int] = []
+        self._entries: List[Entry] = []
+
+    # ----- reading -----
+
+    def _reset_cache(self) -> None:
+        self._inode = None
+        self._offset = 0
+        self._epoch = ""
+        self._versions = []
+        self._entries = []
+
+    def _refresh(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset_cache()
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # Replaced (compaction, recreated): read it again from the top
+            self._reset_cache()
+            self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Only consume complete lines; a half-written one is read next time
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "epoch" in item:
+                self._epoch = str(item["epoch"])
+            elif "v" in item:
+                self._versions.append(int(item["v"]))
+                self._entries.append(
+                    (int(item["v"]), item["kind"], str(item["id"]), bool(item.get("deleted")))
+                )
+        self._offset += end
+
+    def current(self) -> Tuple[str, int]:
+        """(epoch, version); ("", 0) before anything was logged."""
+        with self._lock:
+            self._refresh()
+            return (self._epoch, self._versions[-1] if self._versions else 0)
+
+    def changes_since(self, epoch: str, since: int) -> Optional[ChangeSet]:
+        """
+        Everything logged after version `since`, or None if the client has
+        to start over (unknown epoch, or a version this log never issued).
+        """
+        with self._lock:
+            self._refresh()
+            version = self._versions[-1] if self._versions else 0
+            if not epoch or epoch != self._epoch or since < 0 or since > version:
+                return None
+            changes = ChangeSet(version)
+            for _, kind, webcast_id, deleted in self._entries[bisect_right(self._versions, since):]:
+                if kind == KIND_STATE:
+                    changes.state.add(webcast_id)
+                elif deleted:
+                    changes.webinars.discard(webcast_id)
+                    changes.removed.add(webcast_id)
+                else:
+                    changes.removed.discard(webcast_id)
+                    changes.webinars.add(webcast_id)
+            return changes
+
+    # ----- writing -----
+
+    def _read_tail_locked(self) -> Tuple[str, int, bool]:
+        # (epoch, version, torn): the parsed cache may lag other processes,
+        # and a crash may have left a half-written last line behind
+        with self._lock:
+            self._refresh()
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            version = self._versions[-1] if self._versions else 0
+            return (self._epoch, version, size > self._offset)
+
+    def start(self) -> Tuple[str, int]:
+        """
+        current(), creating the log if needed. A client that loads the full
+        catalog after this holds everything up to the returned version.
+        """
+        epoch, version = self.current()
+        if not epoch:
+            self._append([])
+            epoch, version = self.current()
+        return (epoch, version)
+
+    def _append(self, entries: List[Tuple[str, str, bool]]) -> int:
+        with FileLock(self.lock_path, exclusive=True):
+            epoch, version, torn = self._read_tail_locked()
+            lines = ["\n"] if torn else []
+            if not epoch:
+                lines.append(json.dumps({"epoch": os.urandom(8).hex()}) + "\n")
+            for kind, webcast_id, deleted in entries:
+                version += 1
+                entry: Dict[str, Any] = {"v": version, "kind": kind, "id": webcast_id}
+                if deleted:
+                    entry["deleted"] = True
+                lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+            if not lines:
+                return version
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if size >= self.compact_bytes:
+                self._compact_locked()
+        return version
+
+    def record_state(self, webcast_ids: Iterable[str]) -> int:
+        """Log watched/favorite changes; returns the new version."""
+        ids = list(dict.fromkeys(webcast_ids))
+        if not ids:
+            return self.current()[1]
+        return self._append([(KIND_STATE, str(i), False) for i in ids])
+
+    def record_dataset(self, digests: Dict[str, str]) -> Tuple[int, int]:
+        """
+        Log the difference between the dataset fetch.py just saved (its
+        record digests) and the previous one. Returns (changed, removed).
+        """
+        previous = self._load_digests()
+        changed = [i for i, d in digests.items() if previous.get(i) != d]
+        removed = [i for i in previous if i not in digests]
+        self._append(
+            [(KIND_WEBINAR, i, False) for i in changed] + [(KIND_WEBINAR, i, True) for i in removed]
+        )
+        atomic_write_json(self.digests_path, digests, separators=(",", ":"))
+        return (len(changed), len(removed))
+
+    def _load_digests(self) -> Dict[str, str]:
+        try:
+            with open(self.digests_path, "r", encoding="utf-8") as f:
+                digests = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return digests if isinstance(digests, dict) else {}
+
+    def _compact_locked(self) -> None:
+        epoch, _, _ = self._read_tail_locked()
+        with self._lock:
+            latest: Dict[Tuple[str, str], Entry] = {}
+            for entry in self._entries:
+                latest[(entry[1], entry[2])] = entry
+        lines = [json.dumps({"epoch": epoch}) + "\n"]
+        for v, kind, webcast_id, deleted in sorted(latest.values()):
+            entry: Dict[str, Any] = {"v": v, "kind": kind, "id": webcast_id}
+            if deleted:
+                entry["deleted"] = True
+            lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+        atomic_write_bytes(self.path, "".join(lines).encode("utf-8"))
+
+
+class ChangeWatcher:
+    """
+    Wakes threads waiting for a newer feed version. One thread per process
+    polls changes.jsonl (a stat per interval, plus reading new lines); every
+    gunicorn worker and fetch.py append to that same file, so this is how a
+    toggle in one worker reaches event streams held by the others.
+    """
+
+    def __init__(self, feed: ChangeFeed, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.feed = feed
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._current: Tuple[str, int] = ("", 0)
+        self._pid: Optional[int] = None
+
+    def _ensure_started(self) -> None:
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # First use in this process (gunicorn workers are forks)
+            self._pid = os.getpid()
+            self._current = self.feed.current()
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            current = self.feed.current()
+            if current != self._current:
+                with self._cond:
+                    self._current = current
+                    self._cond.notify_all()
+
+    def wait(self, seen: Tuple[str, int], timeout: float) -> Tuple[str, int]:
+        """Block until the (epoch, version) differs from `seen`, or timeout."""
+        self._ensure_started()
+        with self._cond:
+            self._cond.wait_for(lambda: self._current != seen, timeout)
+            return self._current
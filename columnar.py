@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# columnar.py
+#
+# Compact binary copy of data.jsonl for the app (data.columns). fetch.py
+# writes it next to the dataset; app.py memory-maps it instead of parsing
+# every JSON line, and gets read-only records that cost two slots each
+# instead of a ~20-key dict.
+#
+# Layout, all in one file so it is replaced with a single rename:
+#   magic | descriptions (UTF-8, back to back) | columns | string table
+#   | trailer JSON | trailer offset, trailer length, magic
+#
+# - Numeric fields are int64/float64 arrays.
+# - Strings (titles, dates, tags, ...) are interned into one table and
+#   columns hold uint32 ids into it (0 = None). Each string is decoded the
+#   first time it is read and cached, so opening the file decodes nothing.
+# - List-of-string fields (cysa_tags, focusAreas, ...) are an id array plus
+#   per-record offsets into it, so a tag is stored once, not once per record.
+# - Descriptions are never decoded at load time: a record slices its bytes
+#   out of the mapping when (if) something asks for them.
+#
+# The trailer names the data file signature (inode, mtime_ns, size) it
+# was built from; readers ignore a snapshot that doesn't match, so a
+# dataset changed by other means falls back to data.jsonl.
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from statestore import fsync_dir
+
+COLUMNAR_FILE = "data.columns"
+
+# Stored out of line and only read on access
+TEXT_FIELD = "description"
+
+MAGIC = b"WHCOLS1\0"
+_TAIL = struct.Struct("<QQ8s")  # trailer offset, trailer length, magic
+_ALIGN = 8
+
+Signature = Tuple[int, int, int]
+
+
+def source_signature(path: str) -> Optional[Signature]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# ---------- Writing ------------------
+
+
+def _column_kind(values: List[Any]) -> str:
+    if all(type(v) is int for v in values):
+        return "int"
+    if all(type(v) is float for v in values):
+        return "float"
+    if all(v is None or type(v) is str for v in values):
+        return "str"
+    if all(type(v) is list and all(type(x) is str for x in v) for v in values):
+        return "strlist"
+    return "json"  # anything else: the JSON text of each value, interned
+
+
+class ColumnarWriter:
+    """
+    Stream records into `path` (temp file + rename, like NdjsonWriter).
+    Only uniform datasets are written: if a record's keys differ from the
+    first record's (or a description isn't a string), the snapshot is
+    dropped (`written` stays False) and the app keeps reading `source_path`.
+    """
+
+    def __init__(self, path: str, source_path: str) -> None:
+        self.path = path
+        self.source_path = source_path
+        self.tmp_path = f"{path}.tmp.{os.getpid()}"
+        self.count = 0
+        self.written = False
+        self._fields: Optional[Tuple[str, ...]] = None
+        self._values: Dict[str, List[Any]] = {}
+        self._text_offsets = array("Q", [0])
+        self._text_size = 0
+        self._failed = False
+        self._f: Any = None
+
+    def __enter__(self) -> "ColumnarWriter":
+        self._f = open(self.tmp_path, "wb")
+        self._f.write(MAGIC)
+        return self
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._failed:
+            return
+        fields = tuple(record)
+        if self._fields is None:
+            self._fields = fields
+            self._values = {f: [] for f in fields if f != TEXT_FIELD}
+        if fields != self._fields:
+            self._failed = True
+            return
+        for f, v in record.items():
+            if f != TEXT_FIELD:
+                self._values[f].append(v)
+            elif type(v) is str:
+                data = v.encode("utf-8")
+                self._f.write(data)
+                self._text_size += len(data)
+                self._text_offsets.append(self._text_size)
+            else:
+                self._failed = True
+                return
+        self.count += 1
+
+    def _pad(self) -> int:
+        pos = self._f.tell()
+        if pos % _ALIGN:
+            self._f.write(b"\0" * (_ALIGN - pos % _ALIGN))
+        return self._f.tell()
+
+    def _write_section(self, data: bytes) -> List[int]:
+        offset = self._pad()
+        self._f.write(data)
+        return [offset, len(data)]
+
+    def _finish(self) -> None:
+        assert self._fields is not None
+        strings: Dict[str, int] = {}
+
+        def intern(s: Optional[str]) -> int:
+            if s is None:
+                return 0
+            i = strings.get(s)
+            if i is None:
+                i = strings[s] = len(strings) + 1
+            return i
+
+        columns: List[Dict[str, Any]] = []
+        for name in self._fields:
+            if name == TEXT_FIELD:
+                offsets = self._text_offsets
+                columns.append(
+                    {"name": name, "kind": "text", "offsets": self._write_section(offsets.tobytes())}
+                )
+                continue
+            values = self._values.pop(name)
+            kind = _column_kind(values)
+            column: Dict[str, Any] = {"name": name, "kind": kind}
+            try:
+                if kind == "int":
+                    column["data"] = self._write_section(array("q", values).tobytes())
+                elif kind == "float":
+                    column["data"] = self._write_section(array("d", values).tobytes())
+            except OverflowError:
+                kind = column["kind"] = "json"
+            if kind == "str":
+                column["data"] = self._write_section(array("I", map(intern, values)).tobytes())
+            elif kind == "strlist":
+                ids = array("I")
+                offsets = array("I", [0])
+                for v in values:
+                    ids.extend(map(intern, v))
+                    offsets.append(len(ids))
+                column["data"] = self._write_section(ids.tobytes())
+                column["offsets"] = self._write_section(offsets.tobytes())
+            elif kind == "json":
+                encoded = (json.dumps(v, ensure_ascii=False, sort_keys=True) for v in values)
+                column["data"] = self._write_section(array("I", map(intern, encoded)).tobytes())
+            columns.append(column)
+
+        # Entry 0 (None) is empty; string id j is blob[offsets[j]:offsets[j + 1]]
+        offsets = array("Q", [0, 0])
+        string_data = self._pad()
+        for text in strings:
+            data = text.encode("utf-8")
+            self._f.write(data)
+            offsets.append(offsets[-1] + len(data))
+        trailer = {
+            "count": self.count,
+            "byteorder": sys.byteorder,
+            "source": source_signature(self.source_path),
+            "text": [len(MAGIC), self._text_size],
+            "strings": {
+                "data": [string_data, offsets[-1]],
+                "offsets": self._write_section(offsets.tobytes()),
+            },
+            "columns": columns,
+        }
+        data = json.dumps(trailer, separators=(",", ":")).encode("utf-8")
+        offset = self._f.tell()
+        self._f.write(data)
+        self._f.write(_TAIL.pack(offset, len(data), MAGIC))
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None and not self._failed and self._fields is not None:
+            self._finish()
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            os.replace(self.tmp_path, self.path)
+            fsync_dir(self.path)
+            self.written = True
+            return
+        self._f.close()
+        os.remove(self.tmp_path)
+        if exc_type is None and os.path.exists(self.path):
+            # Stale now: don't leave it around looking current
+            os.remove(self.path)
+
+
+# ---------- Reading ------------------
+
+
+class ColumnarCatalog:
+    """One mapped data.columns file: field order plus a getter per field."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if len(mm) < len(MAGIC) + _TAIL.size or mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a columnar snapshot")
+        offset, length, magic = _TAIL.unpack(mm[-_TAIL.size :])
+        if magic != MAGIC:
+            raise ValueError(f"{path}: truncated")
+        trailer = json.loads(mm[offset : offset + length])
+        if trailer["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path}: written on a {trailer['byteorder']}-endian machine")
+
+        self.count: int = trailer["count"]
+        self.source: Optional[Signature] = tuple(trailer["source"]) if trailer["source"] else None
+        view = memoryview(mm)
+
+        def section(where: List[int], typecode: str) -> memoryview:
+            start, size = where
+            return view[start : start + size].cast(typecode)
+
+        string_base = trailer["strings"]["data"][0]
+        string_offsets = section(trailer["strings"]["offsets"], "Q")
+        decoded: List[Optional[str]] = [None] * (len(string_offsets) - 1)
+
+        def string(j: int) -> Optional[str]:
+            s = decoded[j]
+            if s is None and j:
+                start = string_base + string_offsets[j]
+                s = decoded[j] = str(mm[start : string_base + string_offsets[j + 1]], "utf-8")
+            return s
+
+        text_base = trailer["text"][0]
+
+        getters: Dict[str, Callable[[int], Any]] = {}
+        for column in trailer["columns"]:
+            name, kind = column["name"], column["kind"]
+            if kind == "int":
+                getters[name] = section(column["data"], "q").__getitem__
+            elif kind == "float":
+                getters[name] = section(column["data"], "d").__getitem__
+            elif kind == "str":
+                ids = section(column["data"], "I")
+                getters[name] = lambda i, ids=ids: string(ids[i])
+            elif kind == "strlist":
+                ids = section(column["data"], "I")
+                offsets = section(column["offsets"], "I")
+                getters[name] = lambda i, ids=ids, o=offsets: [
+                    string(j) for j in ids[o[i] : o[i + 1]]
+                ]
+            elif kind == "json":
+                ids = section(column["data"], "I")
+                getters[name] = lambda i, ids=ids: json.loads(string(ids[i]))  # type: ignore[arg-type]
+            elif kind == "text":
+                offsets = section(column["offsets"], "Q")
+                getters[name] = lambda i, o=offsets: str(
+                    mm[text_base + o[i] : text_base + o[i + 1]], "utf-8"
+                )
+            else:
+                raise ValueError(f"{path}: unknown column kind {kind!r}")
+
+        self.fields: Tuple[str, ...] = tuple(c["name"] for c in trailer["columns"])
+        self.getters = getters
+        self._items = tuple(getters.items())
+
+    def __len__(self) -> int:
+        return self.count
+
+    def records(self) -> List["WebinarRecord"]:
+        return [WebinarRecord(self, i) for i in range(self.count)]
+
+    def record_dict(self, i: int) -> Dict[str, Any]:
+        return {name: get(i) for name, get in self._items}
+
+
+class WebinarRecord(Mapping):
+    """
+    Read-only dict-like view of record i of a ColumnarCatalog. Values are
+    read from the mapping on access (descriptions decoded each time), so
+    copy it with to_dict() when a field is needed repeatedly.
+    """
+
+    __slots__ = ("_catalog", "_i")
+
+    def __init__(self, catalog: ColumnarCatalog, i: int) -> None:
+        self._catalog = catalog
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        return self._catalog.getters[key](self._i)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = self._catalog.getters.get(key)
+        return default if getter is None else getter(self._i)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._catalog.getters
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._catalog.fields)
+
+    def __len__(self) -> int:
+        return len(self._catalog.fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._catalog.record_dict(self._i)
+
+    def with_state(self, watched: bool, favorite: bool) -> "MergedWebinar":
+        return MergedWebinar(self._catalog, self._i, watched, favorite)
+
+
+class MergedWebinar(WebinarRecord):
+    """A WebinarRecord plus the user's watched/favorite flags."""
+
+    __slots__ = ("watched", "favorite")
+
+    STATE_FIELDS = ("watched", "favorite")
+
+    def __init__(self, catalog: ColumnarCatalog, i: int, watched: bool, favorite: bool) -> None:
+        self._catalog = catalog
+        self._i = i
+        self.watched = watched
+        self.favorite = favorite
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.STATE_FIELDS:
+            return getattr(self, key)
+        return super().__getitem__(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.STATE_FIELDS:
+            return getattr(self, key)
+        return super().get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.STATE_FIELDS or super().__contains__(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._catalog.fields
+        yield from self.STATE_FIELDS
+
+    def __len__(self) -> int:
+        return len(self._catalog.fields) + len(self.STATE_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = self._catalog.record_dict(self._i)
+        d["watched"] = self.watched
+        d["favorite"] = self.favorite
+        return d
+
+
+def load_records(path: str, source_path: str) -> Optional[List[WebinarRecord]]:
+    """
+    Records from the snapshot at `path` if it was built from the current
+    `source_path`; None if it is missing, stale or unreadable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        catalog = ColumnarCatalog(path)
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+    if catalog.source != source_signature(source_path):
+        return None
+    return catalog.records()
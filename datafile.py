@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# datafile.py
+#
+# Webinar records on disk as newline-delimited JSON (data.jsonl), written
+# one record at a time and read back lazily, so neither fetch.py nor the
+# app has to hold the whole archive as one JSON document. The legacy
+# pretty-printed data.json ({"webinars": [...]}) is still readable.
+
+import json
+import os
+from typing import Any, Dict, Iterator, Optional
+
+from statestore import fsync_dir
+
+DATA_FILE = "data.jsonl"  # one webinar record per line
+LEGACY_DATA_FILE = "data.json"  # {"webinars": [...]}, read-only fallback
+
+
+def current_data_file(
+    data_file: str = DATA_FILE, legacy_data_file: str = LEGACY_DATA_FILE
+) -> str:
+    """data.jsonl once fetch.py has written one, else the legacy file."""
+    if os.path.exists(data_file) or not os.path.exists(legacy_data_file):
+        return data_file
+    return legacy_data_file
+
+
+def iter_records(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records one by one. Missing or unreadable files yield nothing;
+    a torn last line (crash mid-write of a non-atomic copy) is skipped.
+    """
+    path = path or current_data_file()
+    if not os.path.exists(path):
+        return
+
+    if not path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                payload = json.load(f)
+            except json.JSONDecodeError:
+                return
+        yield from payload.get("webinars", [])
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class NdjsonWriter:
+    """
+    Stream records into `path` via a temp file that is fsynced and renamed
+    into place on success, so readers never see a half-written dataset.
+    On an exception the temp file is discarded and `path` is untouched.
+    """
+
+    def __init__(self, path: str = DATA_FILE) -> None:
+        self.path = path
+        self.tmp_path = f"{path}.tmp.{os.getpid()}"
+        self.count = 0
+        self._f: Any = None
+
+    def __enter__(self) -> "NdjsonWriter":
+        self._f = open(self.tmp_path, "w", encoding="utf-8")
+        return self
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._f.write("\n")
+        self.count += 1
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is not None:
+            self._f.close()
+            os.remove(self.tmp_path)
+            return
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self.tmp_path, self.path)
+        fsync_dir(self.path)
@@ -1,15 +1,61 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import os
+import random
+import re
+import threading
 import time
-from typing import Any, Dict, List
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+)
 
 import requests
 
-API_URL = "https://www.sans.org/api/algolia"
+import metrics
+import sqlitestore
+from changefeed import ChangeFeed, record_digest
+from columnar import COLUMNAR_FILE, ColumnarWriter
+from datafile import DATA_FILE, NdjsonWriter, current_data_file, iter_records
+from fetchcache import (
+    DEFAULT_TTL_SECONDS,
+    CacheMiss,
+    ResponseCache,
+    finish_crawl,
+    load_crawl,
+    start_crawl,
+)
+from pipeline import PipelineStats, staged
+from search_index import update_search_index
+from statestore import atomic_write_json
+
+# Overridable so fetch.py can be pointed at a local stub (bench/stub_algolia.py)
+API_URL = os.environ.get("WEBINARHUNT_API_URL", "https://www.sans.org/api/algolia")
 INDEX_NAME = "webinar_single_startDateTimestamp_asc"
 
-DATA_FILE = "data.json"  # canonical webinar data (no user state)
+DEFAULT_CONCURRENCY = 4  # parallel page requests after page 0
+DEFAULT_TRANSFORM_WORKERS = 0  # processes tagging pages (0 = in the main process)
+MAX_RETRIES = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+ID_INDEX_FILE = "id_index.json"  # objectID -> webcastId lookup for app.py
+SEARCH_INDEX_FILE = "search_index.json"  # inverted index for /api/search
+SYNC_STATE_FILE = "sync_state.json"  # high-water marks for --incremental
+
+# "json" (data.jsonl) or "sqlite" (see sqlitestore.py); must match app.py
+STORAGE_BACKEND = os.environ.get("WEBINARHUNT_STORAGE", "json").lower()
 
 # --- CySA+ keyword mapping -----------------------------------------------
 
@@ -150,14 +196,60 @@ CYSA_KEYWORD_MAP = {
 }
 
 
-def save_data(webinars: List[Dict[str, Any]]) -> None:
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump({"webinars": webinars}, f, indent=2, ensure_ascii=False)
+def save_data(webinars: Iterable[Dict[str, Any]]) -> int:
+    """
+    Write the dataset as records arrive (data.jsonl, atomically replaced,
+    or the sqlite tables). Returns the number of records written.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        # Upsert by webcastId; webinars no longer in the archive are dropped
+        return sqlitestore.save_data(webinars)
+    with NdjsonWriter(DATA_FILE) as writer:
+        for w in webinars:
+            writer.write(w)
+    return writer.count
+
+
+def iter_existing_data() -> Iterator[Dict[str, Any]]:
+    if STORAGE_BACKEND == "sqlite":
+        return sqlitestore.iter_data()
+    # data.jsonl, or a data.json left over from before streaming
+    return iter_records()
 
 
-def build_payload(page: int, archived_before_ts: int) -> Dict[str, Any]:
+def load_sync_state() -> Dict[str, int]:
     """
-    Archived = endDateTimestamp < now.
+    {"updated_since": <max updatedAtTimestamp seen>,
+     "archived_before": <endDateTimestamp cut-off of the last run>}
+    """
+    if not os.path.exists(SYNC_STATE_FILE):
+        return {}
+    with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+
+def save_sync_state(updated_since: int, archived_before_ts: int) -> None:
+    atomic_write_json(
+        SYNC_STATE_FILE,
+        {"updated_since": updated_since, "archived_before": archived_before_ts},
+        indent=2,
+    )
+
+
+def save_id_index(index: Dict[str, str]) -> None:
+    # Lets the app resolve legacy objectID-only toggles without data.jsonl
+    atomic_write_json(ID_INDEX_FILE, index, separators=(",", ":"))
+
+
+def build_payload(
+    page: int, archived_before_ts: int, extra_filters: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Archived = endDateTimestamp < now. extra_filters are ANDed on, e.g.
+    ["updatedAtTimestamp>=1700000000"] for incremental syncs.
     """
     return {
         "requests": [
@@ -170,7 +262,8 @@ def build_payload(page: int, archived_before_ts: int) -> Dict[str, Any]:
                     "highlightPreTag": "__ais-highlight__",
                     "hitsPerPage": 100,
                     "maxValuesPerFacet": 10,
-                    "numericFilters": [f"endDateTimestamp<{archived_before_ts}"],
+                    "numericFilters": [f"endDateTimestamp<{archived_before_ts}"]
+                    + (extra_filters or []),
                     "page": page,
                     "query": "",
                 },
@@ -179,10 +272,41 @@ def build_payload(page: int, archived_before_ts: int) -> Dict[str, Any]:
     }
 
 
+def retry_delay(attempt: int, resp: Optional[requests.Response] = None) -> float:
+    """
+    Exponential backoff with full jitter; a Retry-After header (seconds)
+    from a 429/503 wins when it asks for longer.
+    """
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt))
+    if resp is not None:
+        try:
+            retry_after = float(resp.headers.get("retry-after", ""))
+        except ValueError:
+            retry_after = 0.0
+        delay = max(delay, min(retry_after, BACKOFF_MAX_SECONDS))
+    return delay
+
+
 def fetch_page(
-    session: requests.Session, page: int, archived_before_ts: int
+    session: requests.Session,
+    page: int,
+    archived_before_ts: int,
+    extra_filters: Optional[List[str]] = None,
+    cache: Optional[ResponseCache] = None,
 ) -> Dict[str, Any]:
-    payload = build_payload(page, archived_before_ts)
+    """
+    One archive page. With a cache, a fresh cached copy is returned as is,
+    a stale one is revalidated, and whatever comes back is saved.
+    """
+    payload = build_payload(page, archived_before_ts, extra_filters)
+
+    cached = cache.get(payload) if cache is not None else None
+    if cache is not None:
+        if cached is not None and cache.is_fresh(cached):
+            metrics.FETCH_CACHE.inc(result="hit")
+            return cached.data
+        if cache.offline:
+            raise CacheMiss(f"page {page} is not in the fetch cache ({cache.directory})")
 
     headers = {
         "accept": "*/*",
@@ -191,10 +315,100 @@ def fetch_page(
         "referer": "https://www.sans.org/webcasts",
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
     }
+    if cached is not None:
+        headers.update(cached.conditional_headers())
+
+    with metrics.FETCH_PAGE_SECONDS.time():
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                resp = session.post(API_URL, json=payload, headers=headers, timeout=20)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                metrics.FETCH_RETRIES.inc(reason=type(e).__name__)
+                time.sleep(retry_delay(attempt))
+                continue
+
+            if resp.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                metrics.FETCH_RETRIES.inc(reason=str(resp.status_code))
+                time.sleep(retry_delay(attempt, resp))
+                continue
+
+            if resp.status_code == 304 and cached is not None:
+                metrics.FETCH_CACHE.inc(result="revalidated")
+                cache.put(payload, cached.data, cached.validators)  # type: ignore[union-attr]
+                return cached.data
+
+            resp.raise_for_status()
+            data = resp.json()
+            if cache is not None:
+                metrics.FETCH_CACHE.inc(result="miss")
+                cache.put(payload, data, resp.headers)
+            return data
+
+    raise AssertionError("unreachable")
+
+
+_thread_local = threading.local()
+
+
+def _thread_session() -> requests.Session:
+    # requests.Session isn't documented as thread-safe: one per worker
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.session = session
+    return session
+
+
+def page_hits(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    results = data.get("results", [])
+    if not results:
+        return []
+    return results[0].get("hits", [])
+
+
+def iter_pages(
+    archived_before_ts: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    extra_filters: Optional[List[str]] = None,
+    cache: Optional[ResponseCache] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Hits per page, in page order, yielded as soon as each page (and every
+    page before it) has arrived. Page 0 tells us nbPages; the rest are
+    fetched with at most `concurrency` requests in flight.
+    """
 
-    resp = session.post(API_URL, json=payload, headers=headers, timeout=20)
-    resp.raise_for_status()
-    return resp.json()
+    def hits_for(page: int) -> List[Dict[str, Any]]:
+        return page_hits(
+            fetch_page(_thread_session(), page, archived_before_ts, extra_filters, cache)
+        )
+
+    first = fetch_page(_thread_session(), 0, archived_before_ts, extra_filters, cache)
+    hits0 = page_hits(first)
+    if not hits0:
+        return
+    yield hits0
+
+    nb_pages = first["results"][0].get("nbPages", 1)
+    rest = range(1, nb_pages)
+
+    if concurrency <= 1:
+        for p in rest:
+            yield hits_for(p)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # A sliding window rather than pool.map(), which would request
+            # every page up front and hold them all if the consumer is slow.
+            # Yielded in page order, so data.jsonl stays byte-stable.
+            window: Deque["Future[List[Dict[str, Any]]]"] = deque()
+            for p in rest:
+                window.append(pool.submit(hits_for, p))
+                if len(window) >= 2 * concurrency:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
 
 
 def compute_duration_hours(hit: Dict[str, Any]) -> float | None:
@@ -244,84 +458,376 @@ def format_duration_label(hours: float) -> str:
     return " ".join(parts)
 
 
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Regex alternation shaped like a trie ("ab(?:c|d)" rather than
+    "abc|abd"), so each position in the text is tried against shared
+    prefixes once instead of against every keyword.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = "(?:" + "|".join(alts) + ")"
+        # Greedy "?" prefers the longer keyword, backtracking if needed
+        return body + "?" if "" in node else body
+
+    return build(trie)
+
+
+# Keywords only count as whole words/phrases ("ids" no longer matches
+# "kids", "bec" no longer matches "because"); a trailing plural "s" is ok.
+_WORD_START = r"(?<![a-z0-9])"
+_WORD_END = r"s?(?![a-z0-9])"
+
+_cysa_matcher: Optional[Tuple[Pattern[str], Dict[str, FrozenSet[str]]]] = None
+
+
+def compile_cysa_matcher(
+    keyword_map: Dict[str, str],
+) -> Tuple[Pattern[str], Dict[str, FrozenSet[str]]]:
+    """
+    One compiled pattern for every keyword, plus the tags each keyword
+    implies. The keyword is matched inside a lookahead, so every word start
+    is tried even within an earlier match ("post-incident response" finds
+    "incident response" too). It reports the longest keyword at each start,
+    so a phrase also carries the tags of keywords nested inside it
+    ("mitre att&ck framework" -> both MITRE tags).
+    """
+    keywords = sorted({kw.strip() for kw in keyword_map})
+    tag_for = {kw.strip(): tag for kw, tag in keyword_map.items()}
+
+    tags_for: Dict[str, FrozenSet[str]] = {}
+    for kw in keywords:
+        tags_for[kw] = frozenset(
+            tag
+            for other, tag in tag_for.items()
+            if re.search(_WORD_START + re.escape(other) + _WORD_END, kw)
+        )
+
+    keyword = _WORD_START + "(" + _trie_pattern(keywords) + ")" + _WORD_END
+    pattern = re.compile("(?=" + keyword + ")")
+    return (pattern, tags_for)
+
+
 def map_cysa_tags(title: str, description: str = "") -> list[str]:
     """
     Generate CySA+ tags from title/description using CYSA_KEYWORD_MAP.
-    Simple substring match; tune keywords if it gets too noisy.
+    Whole-word matching in a single pass over the text; the matcher is
+    compiled on first use and shared for the life of the process.
     """
+    global _cysa_matcher
+    if _cysa_matcher is None:
+        _cysa_matcher = compile_cysa_matcher(CYSA_KEYWORD_MAP)
+    pattern, tags_for = _cysa_matcher
+
     text = f"{title or ''} {description or ''}".lower()
     tags = set()
 
-    for kw, tag in CYSA_KEYWORD_MAP.items():
-        if kw in text:
-            tags.add(tag)
+    for kw in pattern.findall(text):
+        tags.update(tags_for[kw])
 
     # Stable order for UI
     return sorted(tags)
 
 
-def main() -> None:
-    now_ts = int(time.time())
-    session = requests.Session()
+def retag_existing() -> int:
+    """Re-run map_cysa_tags over the saved dataset; no network needed."""
+
+    def retagged(webinars: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for w in webinars:
+            w["cysa_tags"] = map_cysa_tags(w.get("title") or "", w.get("description") or "")
+            yield w
 
-    page = 0
-    webinars: List[Dict[str, Any]] = []
+    if STORAGE_BACKEND == "sqlite":
+        # Can't stream out of the tables save_data is about to replace
+        return save_data(list(retagged(iter_existing_data())))
+    # Reading data.jsonl while its replacement is written to a temp file
+    return save_data(retagged(iter_existing_data()))
 
-    while True:
-        data = fetch_page(session, page, now_ts)
-        results = data.get("results", [])
-        if not results:
-            break
 
-        result0 = results[0]
-        hits = result0.get("hits", [])
-        nb_pages = result0.get("nbPages", page + 1)
+def transform_hit(hit: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Algolia hit -> data.jsonl record; None for hits without a duration."""
+    duration_hours = compute_duration_hours(hit)
+    if duration_hours is None:
+        return None
+
+    title = (hit.get("title") or "").strip()
+    description = hit.get("description") or ""
+    cysa_tags = map_cysa_tags(title, description)
+
+    duration_bucket = compute_duration_bucket(duration_hours)
+
+    return {
+        "objectID": hit.get("objectID"),
+        "webcastId": hit.get("webcastId"),
+        "title": title,
+        "url": "https://www.sans.org" + (hit.get("url") or ""),
+        "description": description,
+        "startDate": hit.get("startDate"),
+        "startTime": hit.get("startTime"),
+        "endDate": hit.get("endDate"),
+        "endTime": hit.get("endTime"),
+        "duration_hours": duration_hours,
+        "duration_label": format_duration_label(duration_hours),
+        "duration_bucket": duration_bucket,  # 0=<1h, 1≈1h, 2≈2h, etc.
+        "type": hit.get("type"),
+        "focusAreas": hit.get("facets", {}).get("focusArea", []),
+        "language": hit.get("language", []),
+        "createdAt": hit.get("createdAt"),
+        "createdAtTimestamp": hit.get("createdAtTimestamp"),
+        "updatedAt": hit.get("updatedAt"),
+        "updatedAtTimestamp": hit.get("updatedAtTimestamp"),
+        "cysa_tags": cysa_tags,
+    }
+
+
+def transform_page(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Module-level so a process pool can pickle it
+    return [record for record in map(transform_hit, hits) if record is not None]
+
 
-        if not hits:
-            break
+def iter_transformed(
+    pages: Iterable[List[Dict[str, Any]]],
+    workers: int = DEFAULT_TRANSFORM_WORKERS,
+    stats: Optional[PipelineStats] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Records of `pages` in order; fetching overlaps tagging (see pipeline.py)."""
+    return staged(pages, transform_page, workers=workers, stats=stats)
 
-        for hit in hits:
-            duration_hours = compute_duration_hours(hit)
-            if duration_hours is None:
+
+def merge_by_webcast_id(
+    existing: Iterable[Dict[str, Any]], changed: List[Dict[str, Any]]
+) -> Iterator[Dict[str, Any]]:
+    """
+    Replace existing records in place by webcastId; new ones go at the end
+    in fetch order. Nothing is ever removed here: a full run prunes
+    webinars that dropped out of the archive.
+    """
+    changed_by_id = {str(w["webcastId"]): w for w in changed if w.get("webcastId") is not None}
+    for w in existing:
+        yield changed_by_id.pop(str(w.get("webcastId")), w)
+    # Whatever is left wasn't in the dataset yet
+    yield from changed_by_id.values()
+
+
+def fetch_incremental(
+    now_ts: int,
+    sync_state: Dict[str, int],
+    concurrency: int,
+    workers: int = DEFAULT_TRANSFORM_WORKERS,
+    stats: Optional[PipelineStats] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Records created/updated since the last run, plus webinars that became
+    archived since then (their updatedAtTimestamp can be old).
+    """
+    updated_since = int(sync_state["updated_since"])
+    archived_before = int(sync_state["archived_before"])
+
+    pages = iter_pages(
+        now_ts, concurrency, extra_filters=[f"updatedAtTimestamp>={updated_since}"]
+    )
+    newly_archived = iter_pages(
+        now_ts, concurrency, extra_filters=[f"endDateTimestamp>={archived_before}"]
+    )
+
+    # A record can match both queries; keep one copy
+    seen = set()
+    changed: List[Dict[str, Any]] = []
+    for source in (pages, newly_archived):
+        for w in iter_transformed(source, workers, stats):
+            key = w.get("webcastId")
+            if key in seen:
                 continue
+            seen.add(key)
+            changed.append(w)
+    return changed
 
-            title = (hit.get("title") or "").strip()
-            description = hit.get("description") or ""
-            cysa_tags = map_cysa_tags(title, description)
-
-            duration_bucket = compute_duration_bucket(duration_hours)
-
-            record = {
-                "objectID": hit.get("objectID"),
-                "webcastId": hit.get("webcastId"),
-                "title": title,
-                "url": "https://www.sans.org" + (hit.get("url") or ""),
-                "description": description,
-                "startDate": hit.get("startDate"),
-                "startTime": hit.get("startTime"),
-                "endDate": hit.get("endDate"),
-                "endTime": hit.get("endTime"),
-                "duration_hours": duration_hours,
-                "duration_label": format_duration_label(duration_hours),
-                "duration_bucket": duration_bucket,  # 0=<1h, 1≈1h, 2≈2h, etc.
-                "type": hit.get("type"),
-                "focusAreas": hit.get("facets", {}).get("focusArea", []),
-                "language": hit.get("language", []),
-                "createdAt": hit.get("createdAt"),
-                "createdAtTimestamp": hit.get("createdAtTimestamp"),
-                "updatedAt": hit.get("updatedAt"),
-                "updatedAtTimestamp": hit.get("updatedAtTimestamp"),
-                "cysa_tags": cysa_tags,
-            }
 
-            webinars.append(record)
+def rebuild_side_files(archived_before_ts: int) -> None:
+    """
+    One streaming pass over the saved dataset to refresh the search index,
+    the objectID index, the columnar copy for app.py, the --incremental
+    high-water mark and the change feed, then re-render the index page
+    snapshot.
+    """
+    id_index: Dict[str, str] = {}
+    digests: Dict[str, str] = {}
+    updated_since = 0
+
+    def tally() -> Iterator[Dict[str, Any]]:
+        nonlocal updated_since
+        for w in iter_existing_data():
+            if w.get("objectID") is not None and w.get("webcastId") is not None:
+                id_index[str(w["objectID"])] = str(w["webcastId"])
+            if w.get("webcastId") is not None:
+                digests[str(w["webcastId"])] = record_digest(w)
+            updated_since = max(updated_since, int(w.get("updatedAtTimestamp") or 0))
+            if columns is not None:
+                columns.write(w)
+            yield w
+
+    columns: Optional[ColumnarWriter] = None
+    if STORAGE_BACKEND == "sqlite":
+        changed, removed = update_search_index(SEARCH_INDEX_FILE, tally())
+    else:
+        with ColumnarWriter(COLUMNAR_FILE, current_data_file()) as columns:
+            changed, removed = update_search_index(SEARCH_INDEX_FILE, tally())
+        if columns.written:
+            print(f"Columnar copy: {columns.count} webinars to {COLUMNAR_FILE}")
+        else:
+            print(f"Columnar copy: skipped (records differ in shape), app reads {DATA_FILE}")
+    print(f"Search index: {changed} re-indexed, {removed} removed")
+
+    save_sync_state(updated_since, archived_before_ts)
+    if STORAGE_BACKEND != "sqlite":
+        save_id_index(id_index)
+
+    changed, removed = ChangeFeed().record_dataset(digests)
+    print(f"Change feed: {changed} added/updated, {removed} removed")
+
+    # Imported here: nothing else in fetch.py needs Flask
+    import app
+
+    app.write_index_snapshot()
+    print(f"Index page snapshot: {app.INDEX_SNAPSHOT_FILE}")
+
+
+def report_fetch_metrics() -> None:
+    """Print page timings/retries; with WEBINARHUNT_METRICS set, save them for /metrics too."""
+    series = metrics.FETCH_PAGE_SECONDS.snapshot()["series"]
+    if series:
+        counts = series[0][1]
+        pages = int(sum(counts[:-1]))
+        retries = int(sum(v for _, v in metrics.FETCH_RETRIES.snapshot()["series"]))
+        print(f"Fetched {pages} pages, {counts[-1] / pages * 1000:.0f} ms/page, {retries} retries")
+    cache = {labels[0]: int(v) for labels, v in metrics.FETCH_CACHE.snapshot()["series"]}
+    if cache.get("hit") or cache.get("revalidated"):
+        print(f"Page cache: {cache.get('hit', 0)} hits, {cache.get('revalidated', 0)} revalidated")
+    if metrics.ENABLED:
+        # A fixed name: each run replaces the previous run's numbers
+        metrics.registry.write_snapshot("fetch")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fetch the SANS webinar archive")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"parallel page requests (default {DEFAULT_CONCURRENCY}, 1 = sequential)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only fetch records updated/archived since the last run "
+        "(falls back to a full crawl the first time)",
+    )
+    parser.add_argument(
+        "--retag",
+        action="store_true",
+        help="recompute CySA+ tags on the existing dataset and exit (no fetching)",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="rebuild the dataset from the pages cached by the last full crawl (no network)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't read or write the page cache (nor resume an interrupted crawl)",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL_SECONDS,
+        help=f"seconds cached pages stay fresh and an interrupted crawl can be resumed "
+        f"(default {DEFAULT_TTL_SECONDS})",
+    )
+    parser.add_argument(
+        "--transform-workers",
+        type=int,
+        default=DEFAULT_TRANSFORM_WORKERS,
+        help="tag pages on this many processes while the next ones download "
+        f"(default {DEFAULT_TRANSFORM_WORKERS} = in this process; worth it for big archives "
+        "on several cores)",
+    )
+    args = parser.parse_args(argv)
+    if args.transform_workers < 0:
+        parser.error("--transform-workers must be >= 0")
+    if args.offline and (args.incremental or args.no_cache):
+        parser.error(
+            "--offline replays a cached full crawl; it can't be combined with "
+            "--incremental or --no-cache"
+        )
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.retag:
+        print(f"Re-tagged {retag_existing()} webinars")
+        rebuild_side_files(int(load_sync_state().get("archived_before", time.time())))
+        return
 
-        page += 1
-        if page >= nb_pages:
-            break
+    now_ts = int(time.time())
 
-    save_data(webinars)
-    print(f"Saved {len(webinars)} webinars to {DATA_FILE}")
+    sync_state = load_sync_state() if args.incremental else {}
+    has_data = next(iter_existing_data(), None) is not None
+    stats = PipelineStats()
+    workers = args.transform_workers
+
+    if args.offline:
+        crawl = load_crawl()
+        if crawl is None:
+            raise SystemExit("--offline: no cached crawl yet (run fetch.py once online)")
+        now_ts = int(crawl["archived_before"])
+        cache = ResponseCache(now_ts, offline=True)
+        try:
+            count = save_data(
+                iter_transformed(iter_pages(now_ts, concurrency=1, cache=cache), workers, stats)
+            )
+        except CacheMiss as e:
+            raise SystemExit(f"--offline: {e}; dataset left unchanged")
+        print(f"Rebuilt {count} webinars from cached pages (crawl of {time.ctime(now_ts)})")
+    elif sync_state and has_data:
+        changed = fetch_incremental(now_ts, sync_state, args.concurrency, workers, stats)
+        print(f"Incremental sync: {len(changed)} new/updated webinars")
+        if STORAGE_BACKEND == "sqlite":
+            sqlitestore.upsert_webinars(changed)
+        else:
+            save_data(merge_by_webcast_id(iter_existing_data(), changed))
+    else:
+        cache = None
+        if not args.no_cache:
+            crawl = start_crawl(now_ts, ttl=args.cache_ttl)
+            if crawl["resumed"]:
+                print(f"Resuming the crawl started {time.ctime(crawl['started_at'])}")
+            # A resumed crawl keeps its cut-off, so its pages' payloads (and cache keys) match
+            now_ts = int(crawl["archived_before"])
+            cache = ResponseCache(now_ts, ttl=args.cache_ttl)
+        count = save_data(
+            iter_transformed(
+                iter_pages(now_ts, concurrency=args.concurrency, cache=cache), workers, stats
+            )
+        )
+        if cache is not None:
+            finish_crawl(crawl)
+        target = sqlitestore.DB_FILE if STORAGE_BACKEND == "sqlite" else DATA_FILE
+        print(f"Saved {count} webinars to {target}")
+
+    print(stats.summary())
+    rebuild_side_files(now_ts)
+    report_fetch_metrics()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# fetchcache.py
+#
+# On-disk cache of archive pages for fetch.py, one directory per crawl:
+#
+#   fetch_cache/crawl.json              {"archived_before", "started_at", "complete"}
+#   fetch_cache/<archived_before>/<key>.json
+#
+# A page is saved as soon as it arrives, keyed by a hash of its request
+# payload, so every page is a checkpoint. A crawl that dies half way
+# resumes with the same archived_before cut-off (hence the same payloads)
+# and only requests the pages it doesn't have yet. --offline replays the
+# last crawl from disk without touching the network.
+#
+# Pages older than the TTL are re-requested; if the server sent an ETag or
+# Last-Modified with the cached copy, the request is conditional and a 304
+# just renews it. Finishing a crawl deletes the directories of older ones.
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from statestore import atomic_write_json
+
+FETCH_CACHE_DIR = "fetch_cache"
+CRAWL_FILE = "crawl.json"
+
+# Cached pages are reused for this long (and an unfinished crawl resumed)
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class CacheMiss(LookupError):
+    """--offline asked for a page that was never cached."""
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CachedPage:
+    def __init__(self, data: Dict[str, Any], stored_at: float, validators: Dict[str, str]) -> None:
+        self.data = data
+        self.stored_at = stored_at
+        # Response ETag / Last-Modified, for a conditional re-request
+        self.validators = validators
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if "etag" in self.validators:
+            headers["if-none-match"] = self.validators["etag"]
+        if "last-modified" in self.validators:
+            headers["if-modified-since"] = self.validators["last-modified"]
+        return headers
+
+
+class ResponseCache:
+    """Pages of the crawl with cut-off `archived_before`."""
+
+    def __init__(
+        self,
+        archived_before: int,
+        directory: str = FETCH_CACHE_DIR,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        offline: bool = False,
+    ) -> None:
+        self.directory = os.path.join(directory, str(archived_before))
+        self.ttl = ttl
+        self.offline = offline
+
+    def _path(self, payload: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, f"{payload_key(payload)}.json")
+
+    def get(self, payload: Dict[str, Any]) -> Optional[CachedPage]:
+        try:
+            with open(self._path(payload), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return CachedPage(entry["response"], entry["stored_at"], entry.get("validators", {}))
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return self.offline or time.time() - page.stored_at <= self.ttl
+
+    def put(
+        self, payload: Dict[str, Any], data: Dict[str, Any], headers: Mapping[str, str]
+    ) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        validators = {
+            name: headers[name] for name in ("etag", "last-modified") if headers.get(name)
+        }
+        entry = {"stored_at": time.time(), "validators": validators, "response": data}
+        atomic_write_json(self._path(payload), entry, separators=(",", ":"))
+
+
+# ---------- Crawl checkpoints ------------------
+
+
+def load_crawl(directory: str = FETCH_CACHE_DIR) -> Optional[Dict[str, Any]]:
+    """The current or last crawl, or None if nothing was cached yet."""
+    try:
+        with open(os.path.join(directory, CRAWL_FILE), "r", encoding="utf-8") as f:
+            crawl = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return crawl if isinstance(crawl, dict) and "archived_before" in crawl else None
+
+
+def start_crawl(
+    now_ts: int, directory: str = FETCH_CACHE_DIR, ttl: float = DEFAULT_TTL_SECONDS
+) -> Dict[str, Any]:
+    """
+    Resume the unfinished crawl if it started less than `ttl` ago,
+    otherwise begin a new one with cut-off `now_ts`. Returns the crawl
+    ({"archived_before", "started_at", "complete", "resumed"}).
+    """
+    crawl = load_crawl(directory)
+    if crawl is not None and not crawl.get("complete") and now_ts - crawl["started_at"] <= ttl:
+        return {**crawl, "resumed": True}
+    crawl = {"archived_before": now_ts, "started_at": now_ts, "complete": False}
+    os.makedirs(directory, exist_ok=True)
+    atomic_write_json(os.path.join(directory, CRAWL_FILE), crawl)
+    return {**crawl, "resumed": False}
+
+
+def finish_crawl(crawl: Dict[str, Any], directory: str = FETCH_CACHE_DIR) -> None:
+    """Mark the crawl complete and drop the pages of every other crawl."""
+    crawl = {k: v for k, v in crawl.items() if k != "resumed"}
+    atomic_write_json(os.path.join(directory, CRAWL_FILE), {**crawl, "complete": True})
+    keep = str(crawl["archived_before"])
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name != keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# httpcache.py
+#
+# Conditional GET and compression for the big catalog responses. A body is
+# serialized once per catalog version and its gzip/brotli variants are
+# built on first use and kept alongside it, so repeat requests cost a
+# dict lookup (or a 304) instead of a json.dumps plus a compress.
+
+import gzip
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None  # type: ignore[assignment]
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Not worth the CPU (or the extra header bytes) below this
+MIN_COMPRESS_BYTES = 1024
+
+# Clients may keep a copy but must revalidate it; state toggles change the
+# catalog at any time, so there is no safe max-age.
+CACHE_CONTROL = "no-cache"
+
+
+def version_tag(*parts: Any) -> str:
+    """Stable opaque tag for a catalog version, e.g. (route, data sig, state sig)."""
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def htmlsafe_json(text: str) -> str:
+    # Same escaping as Jinja's |tojson, so one string works both as an API
+    # body and inside a <script> tag
+    return (
+        text.replace("<", "\\u003c")
+        .replace(">", "\\u003e")
+        .replace("&", "\\u0026")
+        .replace("'", "\\u0027")
+    )
+
+
+class CachedBody:
+    """
+    One response body plus lazily built compressed variants. The strong
+    ETag differs per encoding (the bytes differ), but all variants share
+    the version tag so any of them validates the current version.
+    """
+
+    def __init__(self, body: bytes, tag: str, last_modified: float, mimetype: str) -> None:
+        self.body = body
+        self.tag = tag
+        self.last_modified = int(last_modified)  # HTTP dates have 1s resolution
+        self.mimetype = mimetype
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding: Optional[str]) -> str:
+        return f"{self.tag}-{encoding}" if encoding else self.tag
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        with self._lock:
+            data = self._variants.get(encoding)
+            if data is None:
+                if encoding == "br":
+                    data = brotli.compress(self.body, quality=BROTLI_QUALITY)
+                else:
+                    data = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+                self._variants[encoding] = data
+            return data
+
+
+def choose_encoding(request: Request, size: int) -> Optional[str]:
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    offers = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = request.accept_encodings.best_match(offers)
+    return best if best in offers else None
+
+
+def is_not_modified(request: Request, cached: CachedBody) -> bool:
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        if request.if_none_match.star_tag:
+            return True
+        return any(
+            tag == cached.tag or tag.startswith(f"{cached.tag}-")
+            for tag in request.if_none_match.as_set()
+        )
+    since = request.if_modified_since
+    if since is not None:
+        return cached.last_modified <= since.timestamp()
+    return False
+
+
+def cached_response(request: Request, cached: CachedBody) -> Response:
+    """200 with the best encoding the client accepts, or 304."""
+    encoding = choose_encoding(request, len(cached.body))
+    if is_not_modified(request, cached):
+        response = Response(status=304)
+    else:
+        response = Response(cached.encoded(encoding), mimetype=cached.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(cached.etag(encoding))
+    response.last_modified = cached.last_modified
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    return response
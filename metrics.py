@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# metrics.py
+#
+# Opt-in instrumentation for app.py and fetch.py, exposed on /metrics in
+# the Prometheus text format:
+#
+#   WEBINARHUNT_METRICS=1 gunicorn -w 4 'app:app'
+#   curl localhost:8411/metrics
+#
+# Timings are always recorded in memory (a perf_counter and a lock per
+# observation); WEBINARHUNT_METRICS turns on the /metrics route and the
+# per-process snapshot files. Every process (each gunicorn worker, the
+# ASGI server, the last fetch.py run) writes its own snapshot to
+# METRICS_DIR about once a second, and /metrics adds them all up, so a
+# scrape sees the whole deployment rather than whichever worker answered.
+# Snapshots of processes that have exited are deleted when read.
+#
+# WEBINARHUNT_PROFILE=cprofile (or pyinstrument, if installed) profiles a
+# random WEBINARHUNT_PROFILE_SAMPLE fraction of all requests, plus those
+# asking for it with ?profile=1 if WEBINARHUNT_PROFILE_REQUESTS=1, and
+# saves one file per request under PROFILE_DIR. Each process profiles at
+# most one request per PROFILE_INTERVAL seconds.
+
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from statestore import atomic_write_json
+
+ENABLED = os.environ.get("WEBINARHUNT_METRICS", "") not in ("", "0")
+METRICS_DIR = os.environ.get("WEBINARHUNT_METRICS_DIR", "metrics")
+
+PROFILER = os.environ.get("WEBINARHUNT_PROFILE", "").lower()  # "", "cprofile", "pyinstrument"
+PROFILE_DIR = os.environ.get("WEBINARHUNT_PROFILE_DIR", "profiles")
+PROFILE_SAMPLE = float(os.environ.get("WEBINARHUNT_PROFILE_SAMPLE", "0") or 0)
+PROFILE_REQUESTS = os.environ.get("WEBINARHUNT_PROFILE_REQUESTS", "") not in ("", "0")
+PROFILE_INTERVAL = float(os.environ.get("WEBINARHUNT_PROFILE_INTERVAL", "10") or 0)
+
+# How often each process rewrites its snapshot file
+FLUSH_INTERVAL = 1.0
+
+PREFIX = "webinarhunt_"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(float(256 * 4**i) for i in range(10))  # 256 B .. 64 MiB
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            series = [[list(k), v] for k, v in self._values.items()]
+        return {"type": "counter", "help": self.help, "labels": list(self.labels), "series": series}
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (non-cumulative) ..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            counts[i] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            series = [[list(k), list(v)] for k, v in self._values.items()]
+        return {
+            "type": "histogram",
+            "help": self.help,
+            "labels": list(self.labels),
+            "buckets": list(self.buckets),
+            "series": series,
+        }
+
+
+class Registry:
+    """
+    The metrics of one process, plus collectors: callables returning extra
+    counter samples at snapshot time (e.g. the catalog cache's own stats).
+    """
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Any] = {}
+        self.collectors: List[Callable[[], Dict[str, Dict[str, Any]]]] = []
+        self._flush_lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+        self._written: Optional[Tuple[str, Dict[str, Any]]] = None
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        metric = self.metrics[PREFIX + name] = Counter(PREFIX + name, help_text, labels)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = self.metrics[PREFIX + name] = Histogram(PREFIX + name, help_text, labels, buckets)
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        snap = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        for collect in self.collectors:
+            snap.update(collect())
+        return snap
+
+    def write_snapshot(self, name: Optional[str] = None) -> None:
+        """Save this process's numbers as METRICS_DIR/<name or pid>.json."""
+        path = os.path.join(METRICS_DIR, f"{name or os.getpid()}.json")
+        with self._flush_lock:
+            snap = self.snapshot()
+            if self._written == (path, snap):
+                return  # idle since the last flush
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            atomic_write_json(path, snap, separators=(",", ":"))
+            self._written = (path, snap)
+
+    def start_flusher(self) -> None:
+        """Write the snapshot every FLUSH_INTERVAL from a daemon thread (once per process)."""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            # First use in this process (gunicorn workers are forks)
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, daemon=True).start()
+
+    def _flush_forever(self) -> None:
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.write_snapshot()
+            except OSError:
+                pass
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "request_duration_seconds", "Request latency by route", ("route", "method")
+)
+REQUESTS = registry.counter("requests_total", "Requests by route and status", ("route", "status"))
+RESPONSE_BYTES = registry.histogram(
+    "response_size_bytes", "Response body size by route (as sent)", ("route",), SIZE_BUCKETS
+)
+STAGE_SECONDS = registry.histogram(
+    "stage_duration_seconds",
+    "Time spent in one step of a request: load_data, load_state, merge, sort, "
+    "render, json_encode, state_save, snapshot_write, sql_query",
+    ("stage",),
+)
+FETCH_PAGE_SECONDS = registry.histogram(
+    "fetch_page_duration_seconds", "fetch.py: one archive page, retries included"
+)
+FETCH_RETRIES = registry.counter("fetch_retries_total", "fetch.py: page request retries", ("reason",))
+FETCH_QUEUE_DEPTH = registry.histogram(
+    "fetch_queue_depth",
+    "fetch.py: pipeline queue depth when an item is added (pages, transforms)",
+    ("queue",),
+    (0, 1, 2, 4, 8, 16, 32, 64),
+)
+FETCH_CACHE = registry.counter(
+    "fetch_cache_total", "fetch.py: pages by cache outcome (hit, miss, revalidated)", ("result",)
+)
+
+
+def timed(stage: str) -> Any:
+    """with timed("merge"): ... records into STAGE_SECONDS."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+# ---------- Exposition ------------------
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # someone else's process
+    return True
+
+
+def load_snapshots(directory: str = METRICS_DIR) -> List[Dict[str, Dict[str, Any]]]:
+    snapshots = []
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        stem = name[: -len(".json")]
+        if stem.isdigit() and not _pid_alive(int(stem)):
+            # A worker that exited (or was recycled): its numbers would be
+            # added to every scrape forever
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return snapshots
+
+
+def merge_snapshots(snapshots: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Sum counters and histogram buckets across processes."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snap in snapshots:
+        for name, metric in snap.items():
+            target = merged.get(name)
+            if target is None or target.get("buckets") != metric.get("buckets"):
+                target = merged[name] = {**metric, "series": {}}
+            series = target["series"]
+            for labels, value in metric["series"]:
+                key = tuple(labels)
+                if key not in series:
+                    series[key] = value
+                elif isinstance(value, list):
+                    series[key] = [a + b for a, b in zip(series[key], value)]
+                else:
+                    series[key] = series[key] + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_text(merged: Dict[str, Dict[str, Any]]) -> str:
+    lines: List[str] = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for values, value in sorted(metric["series"].items()):
+            if metric["type"] == "histogram":
+                cumulative = 0.0
+                for bound, count in zip(metric["buckets"] + ["+Inf"], value[:-1]):
+                    cumulative += count
+                    le = 'le="%s"' % (bound if bound == "+Inf" else _number(bound))
+                    lines.append(
+                        f"{name}_bucket{_labels(metric['labels'], values, le)} {_number(cumulative)}"
+                    )
+                lines.append(f"{name}_sum{_labels(metric['labels'], values)} {repr(value[-1])}")
+                lines.append(f"{name}_count{_labels(metric['labels'], values)} {_number(cumulative)}")
+            else:
+                lines.append(f"{name}{_labels(metric['labels'], values)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+CACHE_REQUESTS = PREFIX + "cache_requests_total"  # filled in by app.py's collector
+
+
+def add_cache_hit_ratios(merged: Dict[str, Dict[str, Any]]) -> None:
+    """Derive a hit-ratio gauge per cache from the summed hit/miss counters."""
+    counts: Dict[str, Dict[str, float]] = {}
+    for (cache, result), value in merged.get(CACHE_REQUESTS, {}).get("series", {}).items():
+        counts.setdefault(cache, {})[result] = value
+    if not counts:
+        return
+    merged[PREFIX + "cache_hit_ratio"] = {
+        "type": "gauge",
+        "help": "Cache hits / lookups since each process started",
+        "labels": ["cache"],
+        "series": {
+            (cache,): c.get("hit", 0.0) / (c.get("hit", 0.0) + c.get("miss", 0.0))
+            for cache, c in counts.items()
+            if c.get("hit") or c.get("miss")
+        },
+    }
+
+
+def exposition() -> str:
+    """/metrics body: this process's fresh numbers plus every other process's last snapshot."""
+    registry.write_snapshot()
+    merged = merge_snapshots(load_snapshots())
+    add_cache_hit_ratios(merged)
+    return render_text(merged)
+
+
+# ---------- Profiling ------------------
+
+_profile_lock = threading.Lock()
+_last_profile = -float("inf")
+
+
+def should_profile(requested: bool) -> bool:
+    """
+    Whether to profile this request: sampled, or asked for (if allowed),
+    and no other profile in this process for PROFILE_INTERVAL seconds.
+    """
+    global _last_profile
+    if not PROFILER:
+        return False
+    if not (requested and PROFILE_REQUESTS) and not random.random() < PROFILE_SAMPLE:
+        return False
+    with _profile_lock:
+        now = time.monotonic()
+        if now - _last_profile < PROFILE_INTERVAL:
+            return False
+        _last_profile = now
+    return True
+
+
+class RequestProfile:
+    """A started profiler for one request; stop() saves it under PROFILE_DIR."""
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        if PROFILER == "pyinstrument":
+            import pyinstrument
+
+            self._profiler: Any = pyinstrument.Profiler()
+            self._profiler.start()
+        else:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> str:
+        """
+        Returns the profile's id, the end of its file name under
+        PROFILE_DIR (ls profiles/*-<id>.*); the path stays server-side.
+        """
+        profile_id = os.urandom(8).hex()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stem = os.path.join(
+            PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.label}-{profile_id}"
+        )
+        if PROFILER == "pyinstrument":
+            self._profiler.stop()
+            with open(f"{stem}.html", "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.disable()
+            self._profiler.dump_stats(f"{stem}.prof")  # python -m pstats / snakeviz
+        return profile_id
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# pipeline.py
+#
+# Staged processing for fetch.py: a producer thread pulls pages off the
+# network into a bounded queue, the transform stage turns each page into
+# records (in this thread, or on a process pool for CPU-heavy tagging of
+# big archives), and the caller consumes the records, e.g. save_data()
+# writing data.jsonl. Both hand-offs are bounded, so a slow writer slows
+# the fetch down instead of buffering the whole archive in memory, and
+# pages come out in the order they went in.
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+import metrics
+
+DEFAULT_QUEUE_PAGES = 8  # fetched pages waiting for the transform stage
+
+
+class StageStats:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0  # time spent doing this stage's work
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def sample_depth(self, depth: int) -> None:
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+        metrics.FETCH_QUEUE_DEPTH.observe(depth, queue=self.name)
+
+    @property
+    def mean_depth(self) -> float:
+        return self._depth_total / self._depth_samples if self._depth_samples else 0.0
+
+
+class PipelineStats:
+    """Per-stage counts, busy time and queue depths of one run."""
+
+    def __init__(self) -> None:
+        self.fetch = StageStats("pages")
+        self.transform = StageStats("transforms")
+        self.records = 0
+        self.workers = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def summary(self) -> str:
+        wall = (self.finished or time.perf_counter()) - self.started
+        fetch, transform = self.fetch, self.transform
+        mode = f"{self.workers} processes" if self.workers else "inline"
+        return (
+            f"Pipeline: {fetch.items} pages in {wall:.1f}s "
+            f"({fetch.items / wall:.1f} pages/s, {self.records / wall:.0f} records/s); "
+            f"fetch busy {fetch.seconds:.1f}s, transform ({mode}) busy {transform.seconds:.1f}s; "
+            f"page queue max {fetch.max_depth} mean {fetch.mean_depth:.1f}, "
+            f"transforms in flight max {transform.max_depth} mean {transform.mean_depth:.1f}"
+        )
+
+
+class _Failed:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+_DONE = object()
+
+
+def _timed_call(fn: Callable[[Any], List[Any]], item: Any) -> Any:
+    # Runs in the worker: its own clock, so busy time excludes queueing
+    start = time.perf_counter()
+    result = fn(item)
+    return (result, time.perf_counter() - start)
+
+
+def staged(
+    items: Iterable[Any],
+    transform: Callable[[Any], List[Any]],
+    workers: int = 0,
+    queue_size: int = DEFAULT_QUEUE_PAGES,
+    stats: Optional[PipelineStats] = None,
+) -> Iterator[Any]:
+    """
+    Yield everything transform(item) returns, item by item in input order.
+    `items` is iterated on a producer thread; with workers > 0 the
+    transform runs on that many processes (it must be picklable, i.e. a
+    module-level function), with at most 2 * workers items in flight.
+    """
+    stats = stats or PipelineStats()
+    stats.workers = workers
+    handoff: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        it = iter(items)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                stats.fetch.seconds += time.perf_counter() - start
+                stats.fetch.items += 1
+                stats.fetch.sample_depth(handoff.qsize())
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:  # re-raised in the consumer
+            put(_Failed(e))
+
+    executor: Optional[Executor] = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # Fork the workers now, before this process has any other threads
+        executor.submit(int).result()
+
+    producer = threading.Thread(target=produce, name="pipeline-producer", daemon=True)
+    producer.start()
+
+    pending: Deque["Future[Any]"] = deque()
+    max_in_flight = 2 * workers
+    exhausted = False
+    try:
+        while True:
+            # Keep the pool busy, but don't wait on the network while a
+            # finished transform could be handed downstream instead
+            while not exhausted and (executor is None or len(pending) < max_in_flight):
+                try:
+                    item = handoff.get(block=executor is None or not pending)
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    exhausted = True
+                elif isinstance(item, _Failed):
+                    raise item.error
+                elif executor is None:
+                    start = time.perf_counter()
+                    out = transform(item)
+                    stats.transform.seconds += time.perf_counter() - start
+                    stats.transform.items += 1
+                    stats.records += len(out)
+                    yield from out
+                else:
+                    pending.append(executor.submit(_timed_call, transform, item))
+                    stats.transform.sample_depth(len(pending))
+            if not pending:
+                if exhausted:
+                    break
+                continue
+            out, seconds = pending.popleft().result()
+            stats.transform.seconds += seconds
+            stats.transform.items += 1
+            stats.records += len(out)
+            yield from out
+    finally:
+        stop.set()
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        stats.finished = time.perf_counter()
+
+
+def pipeline_stats_dict(stats: PipelineStats) -> Dict[str, Any]:
+    """The numbers behind summary(), for bench scripts."""
+    wall = (stats.finished or time.perf_counter()) - stats.started
+    return {
+        "pages": stats.fetch.items,
+        "records": stats.records,
+        "workers": stats.workers,
+        "wall_s": round(wall, 3),
+        "fetch_busy_s": round(stats.fetch.seconds, 3),
+        "transform_busy_s": round(stats.transform.seconds, 3),
+        "page_queue_max": stats.fetch.max_depth,
+        "page_queue_mean": round(stats.fetch.mean_depth, 2),
+        "in_flight_max": stats.transform.max_depth,
+        "in_flight_mean": round(stats.transform.mean_depth, 2),
+    }
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# query.py
+#
+# Server-side version of the Alpine filteredWebinars/sortedWebinars getters.
+# A CatalogView wraps one merged catalog (data + state) and lazily builds
+# the normalized search text and one ordering per sort mode, so a query is
+# a single pass over a pre-sorted index list.
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from metrics import timed
+
+SORT_MODES = ("duration", "title", "watched", "relevance", "recent_created")
+# Orderings that depend on watched/favorite; the others only on the data
+STATE_SORT_MODES = ("watched", "relevance")
+DURATION_FILTERS = ("all", "under1", "approx1", "approx2", "three_plus")
+WATCHED_FILTERS = ("all", "unwatched", "watched")
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+@dataclass
+class WebinarQuery:
+    q: str = ""
+    duration: str = "all"
+    watched: str = "all"
+    favorites_only: bool = False
+    cysa_only: bool = False
+    sort: str = "duration"
+    offset: int = 0
+    limit: int = DEFAULT_LIMIT
+
+
+def _parse_bool(value: Optional[str]) -> bool:
+    return (value or "").lower() in ("1", "true", "yes", "on")
+
+
+def _parse_int(args: Mapping[str, str], name: str, default: int) -> int:
+    raw = args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+
+
+def parse_query_args(args: Mapping[str, str]) -> WebinarQuery:
+    """
+    Build a WebinarQuery from request args. Raises ValueError for unknown
+    modes or bad numbers so the route can answer 400.
+    """
+    query = WebinarQuery(
+        q=(args.get("q") or "").strip().lower(),
+        duration=args.get("duration") or "all",
+        watched=args.get("watched") or "all",
+        favorites_only=_parse_bool(args.get("favorites")),
+        cysa_only=_parse_bool(args.get("cysa")),
+        sort=args.get("sort") or "duration",
+        offset=_parse_int(args, "offset", 0),
+        limit=_parse_int(args, "limit", DEFAULT_LIMIT),
+    )
+
+    if query.sort not in SORT_MODES:
+        raise ValueError(f"sort must be one of {', '.join(SORT_MODES)}")
+    if query.duration not in DURATION_FILTERS:
+        raise ValueError(f"duration must be one of {', '.join(DURATION_FILTERS)}")
+    if query.watched not in WATCHED_FILTERS:
+        raise ValueError(f"watched must be one of {', '.join(WATCHED_FILTERS)}")
+    if query.offset < 0:
+        raise ValueError("offset must be >= 0")
+    query.limit = max(1, min(query.limit, MAX_LIMIT))
+    return query
+
+
+def _bucket(w: Dict[str, Any]) -> int:
+    bucket = w.get("duration_bucket")
+    return int(bucket) if bucket is not None else 999
+
+
+def _created(w: Dict[str, Any]) -> int:
+    return int(w.get("createdAtTimestamp") or 0)
+
+
+def _title(w: Dict[str, Any]) -> str:
+    return (w.get("title") or "").lower()
+
+
+def search_text(w: Dict[str, Any]) -> str:
+    # Same fields the front end used to search: title, description, tags
+    return " ".join(
+        [
+            w.get("title") or "",
+            w.get("description") or "",
+            " ".join(w.get("cysa_tags") or []),
+            " ".join(w.get("focusAreas") or []),
+        ]
+    ).lower()
+
+
+# Sort keys match the comparators the Alpine front end used to run
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Tuple[Any, ...]]] = {
+    "duration": lambda w: (_bucket(w), -_created(w), _title(w)),
+    "title": lambda w: (_title(w),),
+    "watched": lambda w: (1 if w.get("watched") else 0, _bucket(w), _title(w)),
+    "recent_created": lambda w: (-_created(w), _bucket(w), _title(w)),
+    "relevance": lambda w: (
+        0 if w.get("cysa_tags") else 1,
+        0 if w.get("favorite") else 1,
+        1 if w.get("watched") else 0,
+        -_created(w),
+        _bucket(w),
+        _title(w),
+    ),
+}
+
+
+class CatalogView:
+    """
+    Read-only query view over one merged catalog. Build a new one whenever
+    the catalog changes; everything derived here is computed on first use.
+    """
+
+    def __init__(
+        self,
+        webinars: List[Dict[str, Any]],
+        orders: Optional[Dict[str, List[int]]] = None,
+        shared: Optional["CatalogView"] = None,
+    ) -> None:
+        # `orders` seeds per-sort-mode orderings computed earlier for this
+        # exact list (e.g. saved by fetch.py next to the index page). `shared`
+        # is a view of the same records with other (or no) state, e.g. one per
+        # user: search text and data-only orderings are taken from it.
+        self.webinars = webinars
+        self._shared = shared
+        self._search_text: Optional[List[str]] = None
+        self._orders: Dict[str, List[int]] = {
+            mode: order
+            for mode, order in (orders or {}).items()
+            if mode in SORT_KEYS and len(order) == len(webinars)
+        }
+        self._by_webcast_id: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def search_texts(self) -> List[str]:
+        if self._shared is not None:
+            return self._shared.search_texts()
+        if self._search_text is None:
+            self._search_text = [search_text(w) for w in self.webinars]
+        return self._search_text
+
+    def by_webcast_id(self) -> Dict[str, Dict[str, Any]]:
+        if self._by_webcast_id is None:
+            self._by_webcast_id = {
+                str(w["webcastId"]): w for w in self.webinars if w.get("webcastId") is not None
+            }
+        return self._by_webcast_id
+
+    def order(self, mode: str) -> List[int]:
+        order = self._orders.get(mode)
+        if order is None and self._shared is not None and mode not in STATE_SORT_MODES:
+            return self._shared.order(mode)
+        if order is None:
+            with timed("sort"):
+                keys = [SORT_KEYS[mode](w) for w in self.webinars]
+                order = sorted(range(len(keys)), key=keys.__getitem__)
+            self._orders[mode] = order
+        return order
+
+    def orders(self) -> Dict[str, List[int]]:
+        """The orderings computed (or seeded) so far, by sort mode."""
+        orders: Dict[str, List[int]] = {}
+        if self._shared is not None:
+            orders.update(
+                (mode, order)
+                for mode, order in self._shared.orders().items()
+                if mode not in STATE_SORT_MODES
+            )
+        orders.update(self._orders)
+        return orders
+
+    def matches(self, i: int, query: WebinarQuery) -> bool:
+        w = self.webinars[i]
+
+        if query.q and query.q not in self.search_texts()[i]:
+            return False
+
+        bucket = _bucket(w)
+        if query.duration == "under1" and bucket != 0:
+            return False
+        if query.duration == "approx1" and bucket != 1:
+            return False
+        if query.duration == "approx2" and bucket != 2:
+            return False
+        if query.duration == "three_plus" and bucket < 3:
+            return False
+
+        if query.watched == "unwatched" and w.get("watched"):
+            return False
+        if query.watched == "watched" and not w.get("watched"):
+            return False
+
+        if query.favorites_only and not w.get("favorite"):
+            return False
+
+        if query.cysa_only and not w.get("cysa_tags"):
+            return False
+
+        return True
+
+    def query(self, query: WebinarQuery) -> Dict[str, Any]:
+        """
+        Returns {"items", "total", "offset", "limit", "next_offset",
+        "catalog_total"}; next_offset is None on the last page.
+        """
+        end = query.offset + query.limit
+        items: List[Dict[str, Any]] = []
+        total = 0
+        for i in self.order(query.sort):
+            if not self.matches(i, query):
+                continue
+            if query.offset <= total < end:
+                items.append(self.webinars[i])
+            total += 1
+
+        return {
+            "items": items,
+            "total": total,
+            "offset": query.offset,
+            "limit": query.limit,
+            "next_offset": end if end < total else None,
+            "catalog_total": len(self.webinars),
+        }
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# search_index.py
+#
+# Tokenized inverted index over the same fields the front end searches
+# (title, description, CySA+ tags, focus areas). fetch.py builds it and
+# saves it next to data.jsonl; app.py answers /api/search from it with
+# BM25 ranking and prefix matching on the last query term.
+
+import hashlib
+import heapq
+import json
+import math
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from statestore import atomic_write_json
+
+SEARCH_INDEX_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+# Title hits count more than the same word buried in a description
+TITLE_WEIGHT = 2
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MAX_PREFIX_EXPANSIONS = 64
+
+# Dead slots are compacted away once they make up this share of the index
+# (see update_search_index)
+MAX_DEAD_RATIO = 0.25
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def document_tokens(w: Dict[str, Any]) -> List[str]:
+    tokens = tokenize(w.get("title") or "") * TITLE_WEIGHT
+    tokens += tokenize(w.get("description") or "")
+    tokens += tokenize(" ".join(w.get("cysa_tags") or []))
+    tokens += tokenize(" ".join(w.get("focusAreas") or []))
+    return tokens
+
+
+def document_signature(w: Dict[str, Any]) -> str:
+    # Changes iff any indexed field changes; drives incremental updates
+    text = "\x1f".join(
+        [
+            w.get("title") or "",
+            w.get("description") or "",
+            "\x1e".join(w.get("cysa_tags") or []),
+            "\x1e".join(w.get("focusAreas") or []),
+        ]
+    )
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SearchIndex:
+    """
+    Docs live in slots; postings map term -> {slot: term frequency}.
+    A removed doc keeps its slot (webcast id None) until compact().
+    """
+
+    def __init__(self) -> None:
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_lens: List[int] = []
+        self.doc_sigs: List[str] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._slot_by_id: Dict[str, int] = {}
+        self._sorted_terms: Optional[List[str]] = None
+        self._total_len = 0
+        self._live_docs = 0
+
+    # ----- building -----
+
+    @classmethod
+    def build(cls, webinars: Iterable[Dict[str, Any]]) -> "SearchIndex":
+        index = cls()
+        for w in webinars:
+            if w.get("webcastId") is not None:
+                index._add(w)
+        return index
+
+    def _add(self, w: Dict[str, Any]) -> None:
+        webcast_id = str(w["webcastId"])
+        slot = len(self.doc_ids)
+        tokens = document_tokens(w)
+
+        self.doc_ids.append(webcast_id)
+        self.doc_lens.append(len(tokens))
+        self.doc_sigs.append(document_signature(w))
+        self._slot_by_id[webcast_id] = slot
+        self._total_len += len(tokens)
+        self._live_docs += 1
+
+        for token in tokens:
+            posting = self.postings.setdefault(token, {})
+            posting[slot] = posting.get(slot, 0) + 1
+        self._sorted_terms = None
+
+    def _remove_slots(self, slots: Iterable[int]) -> None:
+        dead = set(slots)
+        if not dead:
+            return
+        for slot in dead:
+            webcast_id = self.doc_ids[slot]
+            if webcast_id is not None:
+                del self._slot_by_id[webcast_id]
+            self._total_len -= self.doc_lens[slot]
+            self._live_docs -= 1
+            self.doc_ids[slot] = None
+            self.doc_lens[slot] = 0
+        # One pass over the vocabulary instead of re-tokenizing old text
+        for term in list(self.postings):
+            posting = self.postings[term]
+            for slot in dead.intersection(posting):
+                del posting[slot]
+            if not posting:
+                del self.postings[term]
+        self._sorted_terms = None
+
+    def update(self, webinars: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Bring the index in line with `webinars` (consumed once, lazily),
+        touching only records whose indexed text changed or that were
+        added/removed. Returns (changed, removed) counts.
+        """
+        seen = set()
+        stale: List[int] = []
+        changed: List[Dict[str, Any]] = []
+        for w in webinars:
+            if w.get("webcastId") is None:
+                continue
+            webcast_id = str(w["webcastId"])
+            if webcast_id in seen:
+                continue
+            seen.add(webcast_id)
+            slot = self._slot_by_id.get(webcast_id)
+            if slot is None:
+                changed.append(w)
+            elif self.doc_sigs[slot] != document_signature(w):
+                stale.append(slot)
+                changed.append(w)
+
+        removed = [
+            slot for webcast_id, slot in self._slot_by_id.items() if webcast_id not in seen
+        ]
+
+        self._remove_slots(stale + removed)
+        for w in changed:
+            self._add(w)
+
+        return (len(changed), len(removed))
+
+    def compact(self) -> None:
+        """Drop dead slots and renumber the live ones."""
+        remap: Dict[int, int] = {}
+        doc_ids: List[Optional[str]] = []
+        doc_lens: List[int] = []
+        doc_sigs: List[str] = []
+        for slot, webcast_id in enumerate(self.doc_ids):
+            if webcast_id is None:
+                continue
+            remap[slot] = len(doc_ids)
+            doc_ids.append(webcast_id)
+            doc_lens.append(self.doc_lens[slot])
+            doc_sigs.append(self.doc_sigs[slot])
+
+        self.doc_ids, self.doc_lens, self.doc_sigs = doc_ids, doc_lens, doc_sigs
+        self._slot_by_id = {webcast_id: slot for slot, webcast_id in enumerate(doc_ids)}  # type: ignore[misc]
+        self.postings = {
+            term: {remap[slot]: tf for slot, tf in posting.items()}
+            for term, posting in self.postings.items()
+        }
+
+    def dead_ratio(self) -> float:
+        if not self.doc_ids:
+            return 0.0
+        return (len(self.doc_ids) - self._live_docs) / len(self.doc_ids)
+
+    # ----- querying -----
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+        out: List[str] = []
+        i = bisect_left(terms, prefix)
+        while i < len(terms) and terms[i].startswith(prefix) and len(out) < MAX_PREFIX_EXPANSIONS:
+            out.append(terms[i])
+            i += 1
+        return out
+
+    def search(self, query: str, limit: int = 20) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Every query term must match (the last one as a prefix, so results
+        show up while typing). Returns ([(webcastId, score), ...], total).
+        """
+        tokens = tokenize(query)
+        if not tokens or not self._live_docs:
+            return ([], 0)
+
+        n_docs = self._live_docs
+        avg_len = self._total_len / n_docs if n_docs else 0.0
+
+        scores: Optional[Dict[int, float]] = None
+        for pos, token in enumerate(tokens):
+            if pos == len(tokens) - 1:
+                terms = self._expand_prefix(token)
+            else:
+                terms = [token] if token in self.postings else []
+
+            token_scores: Dict[int, float] = {}
+            for term in terms:
+                posting = self.postings[term]
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for slot, tf in posting.items():
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens[slot] / avg_len)
+                    s = idf * tf * (BM25_K1 + 1) / norm
+                    # Several prefix expansions in one doc: keep the best
+                    if s > token_scores.get(slot, 0.0):
+                        token_scores[slot] = s
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    slot: score + token_scores[slot]
+                    for slot, score in scores.items()
+                    if slot in token_scores
+                }
+            if not scores:
+                return ([], 0)
+
+        assert scores is not None
+        top = heapq.nsmallest(limit, scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return (
+            [(self.doc_ids[slot], round(score, 4)) for slot, score in top],  # type: ignore[misc]
+            len(scores),
+        )
+
+    # ----- persistence -----
+
+    def to_json(self) -> Dict[str, Any]:
+        # Postings as flat [slot delta, tf, slot delta, tf, ...] lists
+        postings: Dict[str, List[int]] = {}
+        for term, posting in self.postings.items():
+            flat: List[int] = []
+            prev = 0
+            for slot in sorted(posting):
+                flat += [slot - prev, posting[slot]]
+                prev = slot
+            postings[term] = flat
+        return {
+            "version": SEARCH_INDEX_VERSION,
+            "doc_ids": self.doc_ids,
+            "doc_lens": self.doc_lens,
+            "doc_sigs": self.doc_sigs,
+            "postings": postings,
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict[str, Any]) -> "SearchIndex":
+        if payload.get("version") != SEARCH_INDEX_VERSION:
+            raise ValueError("Unsupported search index version")
+        index = cls()
+        index.doc_ids = payload["doc_ids"]
+        index.doc_lens = payload["doc_lens"]
+        index.doc_sigs = payload["doc_sigs"]
+        for slot, webcast_id in enumerate(index.doc_ids):
+            if webcast_id is not None:
+                index._slot_by_id[webcast_id] = slot
+                index._total_len += index.doc_lens[slot]
+                index._live_docs += 1
+        for term, flat in payload["postings"].items():
+            posting: Dict[int, int] = {}
+            slot = 0
+            for i in range(0, len(flat), 2):
+                slot += flat[i]
+                posting[slot] = flat[i + 1]
+            index.postings[term] = posting
+        return index
+
+
+def load_search_index(path: str) -> Optional[SearchIndex]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return SearchIndex.from_json(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+        return None
+
+
+def save_search_index(index: SearchIndex, path: str) -> None:
+    atomic_write_json(path, index.to_json(), separators=(",", ":"))
+
+
+def update_search_index(path: str, webinars: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Patch the saved index with whatever changed in `webinars` (or build it
+    if missing/unreadable) and save it. Returns (changed, removed).
+    """
+    index = load_search_index(path)
+    if index is None:
+        index = SearchIndex.build(webinars)
+        changed, removed = (len(index.doc_ids), 0)
+    else:
+        changed, removed = index.update(webinars)
+        if index.dead_ratio() > MAX_DEAD_RATIO:
+            index.compact()
+    if changed or removed:
+        save_search_index(index, path)
+    return (changed, removed)
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# sqlitestore.py
+#
+# Optional SQLite (WAL) storage for webinars + user state. /api/webinars
+# filters, sorts and pages in SQL over indexed columns (query_webinars)
+# instead of the in-memory CatalogView. Enable with
+#   WEBINARHUNT_STORAGE=sqlite  [WEBINARHUNT_DB=webinarhunt.db]
+# and migrate existing JSON files once with
+#   python sqlitestore.py migrate
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from datafile import iter_records
+from query import WebinarQuery, search_text
+from statestore import DEFAULT_USER, StateStore, UserStateStores
+
+DB_FILE = os.environ.get("WEBINARHUNT_DB", "webinarhunt.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS webinars (
+    webcastId TEXT PRIMARY KEY,
+    objectID TEXT,
+    position INTEGER NOT NULL,          -- order as fetched (data file order)
+    duration_bucket INTEGER NOT NULL,
+    createdAtTimestamp INTEGER NOT NULL,
+    updatedAtTimestamp INTEGER NOT NULL,
+    title_lower TEXT NOT NULL,
+    search_text TEXT NOT NULL,          -- query.search_text(), for ?q=
+    record TEXT NOT NULL                -- full record as JSON
+);
+CREATE INDEX IF NOT EXISTS idx_webinars_objectid ON webinars(objectID);
+CREATE INDEX IF NOT EXISTS idx_webinars_position ON webinars(position);
+CREATE INDEX IF NOT EXISTS idx_webinars_created ON webinars(createdAtTimestamp);
+CREATE INDEX IF NOT EXISTS idx_webinars_bucket
+    ON webinars(duration_bucket, createdAtTimestamp DESC, title_lower);
+CREATE INDEX IF NOT EXISTS idx_webinars_title ON webinars(title_lower);
+
+CREATE TABLE IF NOT EXISTS webinar_tags (
+    webcastId TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (webcastId, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_webinar_tags_tag ON webinar_tags(tag);
+
+CREATE TABLE IF NOT EXISTS state (
+    webcastId TEXT PRIMARY KEY,
+    watched INTEGER NOT NULL DEFAULT 0,
+    favorite INTEGER NOT NULL DEFAULT 0
+);
+
+-- Everyone but the default user, whose flags stay in `state`
+CREATE TABLE IF NOT EXISTS user_state (
+    user TEXT NOT NULL,
+    webcastId TEXT NOT NULL,
+    watched INTEGER NOT NULL DEFAULT 0,
+    favorite INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user, webcastId)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('state_version', 0);
+"""
+
+_local = threading.local()
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    """
+    One connection per thread (and per process: gunicorn forks after
+    import, and sqlite connections must not cross a fork).
+    """
+    path = path or DB_FILE
+    key = (os.getpid(), path)
+    conn = getattr(_local, "conns", {}).get(key)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+
+    if not hasattr(_local, "conns"):
+        _local.conns = {}
+    _local.conns[key] = conn
+    return conn
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers
+    # queue on busy_timeout instead of failing halfway through.
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _bump(conn: sqlite3.Connection, key: str) -> None:
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+        (key,),
+    )
+
+
+def _state_version_key(user: str) -> str:
+    return "state_version" if user == DEFAULT_USER else f"state_version:{user}"
+
+
+def versions(path: Optional[str] = None) -> Tuple[int, int]:
+    """(data_version, state_version); bumped on every write."""
+    rows = connect(path).execute(
+        "SELECT key, value FROM meta WHERE key IN ('data_version', 'state_version')"
+    ).fetchall()
+    meta = {r["key"]: r["value"] for r in rows}
+    return (meta.get("data_version", 0), meta.get("state_version", 0))
+
+
+def state_version(user: str = DEFAULT_USER, path: Optional[str] = None) -> int:
+    """Bumped on every write to `user`'s state."""
+    row = (
+        connect(path)
+        .execute("SELECT value FROM meta WHERE key = ?", (_state_version_key(user),))
+        .fetchone()
+    )
+    return row["value"] if row else 0
+
+
+def last_modified(path: Optional[str] = None) -> float:
+    """Latest mtime of the database or its WAL (commits land in the WAL)."""
+    path = path or DB_FILE
+    mtimes = [0.0]
+    for p in (path, f"{path}-wal"):
+        try:
+            mtimes.append(os.stat(p).st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(mtimes)
+
+
+# ---------- Webinars ------------------
+
+
+def _webinar_row(w: Dict[str, Any], position: int) -> Tuple[Any, ...]:
+    return (
+        str(w["webcastId"]),
+        str(w["objectID"]) if w.get("objectID") is not None else None,
+        position,
+        int(w["duration_bucket"]) if w.get("duration_bucket") is not None else 999,
+        int(w.get("createdAtTimestamp") or 0),
+        int(w.get("updatedAtTimestamp") or 0),
+        (w.get("title") or "").lower(),
+        search_text(w),
+        json.dumps(w, ensure_ascii=False),
+    )
+
+
+def _upsert_locked(conn: sqlite3.Connection, webinars: Iterable[Dict[str, Any]]) -> int:
+    row = conn.execute("SELECT COALESCE(MAX(position), -1) FROM webinars").fetchone()
+    next_position = row[0] + 1
+    count = 0
+    for w in webinars:
+        if w.get("webcastId") is None:
+            continue
+        wid = str(w["webcastId"])
+        existing = conn.execute(
+            "SELECT position FROM webinars WHERE webcastId = ?", (wid,)
+        ).fetchone()
+        if existing is not None:
+            position = existing[0]
+        else:
+            position = next_position
+            next_position += 1
+        conn.execute(
+            """
+            INSERT INTO webinars (webcastId, objectID, position, duration_bucket,
+                createdAtTimestamp, updatedAtTimestamp, title_lower, search_text, record)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(webcastId) DO UPDATE SET
+                objectID = excluded.objectID,
+                duration_bucket = excluded.duration_bucket,
+                createdAtTimestamp = excluded.createdAtTimestamp,
+                updatedAtTimestamp = excluded.updatedAtTimestamp,
+                title_lower = excluded.title_lower,
+                search_text = excluded.search_text,
+                record = excluded.record
+            """,
+            _webinar_row(w, position),
+        )
+        conn.execute("DELETE FROM webinar_tags WHERE webcastId = ?", (wid,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO webinar_tags (webcastId, tag) VALUES (?, ?)",
+            [(wid, tag) for tag in w.get("cysa_tags") or []],
+        )
+        count += 1
+    _bump(conn, "data_version")
+    return count
+
+
+def upsert_webinars(
+    webinars: Iterable[Dict[str, Any]], path: Optional[str] = None
+) -> int:
+    """
+    Insert or update records by webcastId. New records are appended after
+    the existing ones. Records without a webcastId can't carry state and
+    are skipped.
+    """
+    conn = connect(path)
+    with _Transaction(conn):
+        return _upsert_locked(conn, webinars)
+
+
+def save_data(webinars: Iterable[Dict[str, Any]], path: Optional[str] = None) -> int:
+    """Make the table match `webinars` exactly (same order), keeping state."""
+    conn = connect(path)
+    with _Transaction(conn):
+        conn.execute("DELETE FROM webinar_tags")
+        conn.execute("DELETE FROM webinars")
+        return _upsert_locked(conn, webinars)
+
+
+def iter_data(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    # Its own connection: the cursor stays valid while the caller writes
+    # through the shared per-thread one
+    connect(path)  # make sure the schema exists
+    conn = sqlite3.connect(path or DB_FILE, timeout=30)
+    try:
+        for (record,) in conn.execute("SELECT record FROM webinars ORDER BY position"):
+            yield json.loads(record)
+    finally:
+        conn.close()
+
+
+def load_data(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    return list(iter_data(path))
+
+
+def resolve_object_id(object_id: str, path: Optional[str] = None) -> Optional[str]:
+    row = (
+        connect(path)
+        .execute("SELECT webcastId FROM webinars WHERE objectID = ?", (object_id,))
+        .fetchone()
+    )
+    return row["webcastId"] if row else None
+
+
+# query.SORT_KEYS as ORDER BY clauses; position breaks ties the way the
+# stable in-memory sort does
+_ORDER_BY = {
+    "duration": "w.duration_bucket, w.createdAtTimestamp DESC, w.title_lower",
+    "title": "w.title_lower",
+    "watched": "watched, w.duration_bucket, w.title_lower",
+    "recent_created": "w.createdAtTimestamp DESC, w.duration_bucket, w.title_lower",
+    "relevance": (
+        "tagged DESC, favorite DESC, watched, w.createdAtTimestamp DESC, "
+        "w.duration_bucket, w.title_lower"
+    ),
+}
+
+_DURATION_WHERE = {
+    "under1": "w.duration_bucket = 0",
+    "approx1": "w.duration_bucket = 1",
+    "approx2": "w.duration_bucket = 2",
+    "three_plus": "w.duration_bucket >= 3",
+}
+
+
+def query_webinars(
+    query: WebinarQuery, user: str = DEFAULT_USER, path: Optional[str] = None
+) -> Dict[str, Any]:
+    """query.CatalogView.query() for `user`'s catalog, run by the database."""
+    if user == DEFAULT_USER:
+        state_join = "LEFT JOIN state s ON s.webcastId = w.webcastId"
+        params: List[Any] = []
+    else:
+        state_join = "LEFT JOIN user_state s ON s.user = ? AND s.webcastId = w.webcastId"
+        params = [user]
+
+    where: List[str] = []
+    if query.q:
+        where.append("instr(w.search_text, ?) > 0")
+        params.append(query.q)
+    if query.duration in _DURATION_WHERE:
+        where.append(_DURATION_WHERE[query.duration])
+    if query.watched == "unwatched":
+        where.append("NOT COALESCE(s.watched, 0)")
+    elif query.watched == "watched":
+        where.append("COALESCE(s.watched, 0)")
+    if query.favorites_only:
+        where.append("COALESCE(s.favorite, 0)")
+    if query.cysa_only:
+        where.append("EXISTS (SELECT 1 FROM webinar_tags t WHERE t.webcastId = w.webcastId)")
+
+    source = f"FROM webinars w {state_join}"
+    if where:
+        source += " WHERE " + " AND ".join(where)
+    select = f"""
+        SELECT w.record,
+            COALESCE(s.watched, 0) AS watched,
+            COALESCE(s.favorite, 0) AS favorite,
+            EXISTS (SELECT 1 FROM webinar_tags t WHERE t.webcastId = w.webcastId) AS tagged
+        {source}
+        ORDER BY {_ORDER_BY[query.sort]}, w.position
+        LIMIT ? OFFSET ?
+    """
+
+    conn = connect(path)
+    # One read snapshot for the page and both counts
+    conn.execute("BEGIN")
+    try:
+        rows = conn.execute(select, params + [query.limit, query.offset]).fetchall()
+        total = conn.execute(f"SELECT COUNT(*) {source}", params).fetchone()[0]
+        catalog_total = conn.execute("SELECT COUNT(*) FROM webinars").fetchone()[0]
+    finally:
+        conn.execute("COMMIT")
+
+    end = query.offset + query.limit
+    return {
+        "items": [
+            {
+                **json.loads(r["record"]),
+                "watched": bool(r["watched"]),
+                "favorite": bool(r["favorite"]),
+            }
+            for r in rows
+        ],
+        "total": total,
+        "offset": query.offset,
+        "limit": query.limit,
+        "next_offset": end if end < total else None,
+        "catalog_total": catalog_total,
+    }
+
+
+# ---------- State ------------------
+
+
+def load_state(
+    path: Optional[str] = None, user: str = DEFAULT_USER
+) -> Dict[str, Dict[str, Any]]:
+    conn = connect(path)
+    if user == DEFAULT_USER:
+        rows = conn.execute("SELECT webcastId, watched, favorite FROM state")
+    else:
+        rows = conn.execute(
+            "SELECT webcastId, watched, favorite FROM user_state WHERE user = ?", (user,)
+        )
+    return {
+        r["webcastId"]: {"watched": bool(r["watched"]), "favorite": bool(r["favorite"])}
+        for r in rows
+    }
+
+
+def update_state(
+    updates: Iterable[Tuple[str, Dict[str, bool]]],
+    path: Optional[str] = None,
+    user: str = DEFAULT_USER,
+) -> None:
+    conn = connect(path)
+    # The default user's rows have no user column
+    key: Tuple[str, ...]
+    if user == DEFAULT_USER:
+        insert = "INSERT OR IGNORE INTO state (webcastId) VALUES (?)"
+        update = "UPDATE state SET {flag} = ? WHERE webcastId = ?"
+        key = ()
+    else:
+        insert = "INSERT OR IGNORE INTO user_state (user, webcastId) VALUES (?, ?)"
+        update = "UPDATE user_state SET {flag} = ? WHERE user = ? AND webcastId = ?"
+        key = (user,)
+    with _Transaction(conn):
+        for webcast_id, flags in updates:
+            conn.execute(insert, (*key, webcast_id))
+            for flag in ("watched", "favorite"):
+                if flag in flags:
+                    conn.execute(
+                        update.format(flag=flag), (1 if flags[flag] else 0, *key, webcast_id)
+                    )
+        _bump(conn, _state_version_key(user))
+
+
+def save_state(
+    state: Dict[str, Dict[str, Any]], path: Optional[str] = None, user: str = DEFAULT_USER
+) -> None:
+    conn = connect(path)
+    rows = [
+        (str(wid), 1 if st.get("watched") else 0, 1 if st.get("favorite") else 0)
+        for wid, st in state.items()
+    ]
+    with _Transaction(conn):
+        if user == DEFAULT_USER:
+            conn.execute("DELETE FROM state")
+            conn.executemany(
+                "INSERT INTO state (webcastId, watched, favorite) VALUES (?, ?, ?)", rows
+            )
+        else:
+            conn.execute("DELETE FROM user_state WHERE user = ?", (user,))
+            conn.executemany(
+                "INSERT INTO user_state (user, webcastId, watched, favorite) VALUES (?, ?, ?, ?)",
+                [(user, *row) for row in rows],
+            )
+        _bump(conn, _state_version_key(user))
+
+
+# ---------- Migration ------------------
+
+
+def migrate_from_json(
+    data_file: Optional[str] = None,
+    state_file: str = "state.json",
+    journal_file: str = "state.journal.jsonl",
+    path: Optional[str] = None,
+    shard_dir: str = "state",
+) -> Tuple[int, int]:
+    """
+    One-shot import of data.jsonl (or legacy data.json) + state.json and
+    its journal, plus every user's shard under `shard_dir`.
+    """
+    stores = UserStateStores(StateStore(state_file, journal_file), shard_dir)
+
+    n_webinars = save_data(iter_records(data_file), path)
+    n_state = 0
+    for user in stores.users():
+        state = stores.store(user).load()
+        save_state(state, path, user=user)
+        n_state += len(state)
+    return (n_webinars, n_state)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("usage: python sqlitestore.py migrate [data.jsonl] [state.json] [journal]")
+        sys.exit(2)
+    n_webinars, n_state = migrate_from_json(*sys.argv[2:5])
+    print(f"Migrated {n_webinars} webinars and {n_state} state entries into {DB_FILE}")
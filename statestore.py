@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# statestore.py
+#
+# Watched/favorite state as a JSON snapshot plus an append-only journal of
+# deltas. A toggle appends one line instead of rewriting the whole file;
+# once the journal grows past a threshold it's folded back into the
+# snapshot (atomic rename). All writers serialize on a lock file, so
+# several gunicorn workers can toggle at once without losing updates.
+#
+# Each user has a store of their own (UserStateStores): the default user
+# keeps state.json, everyone else a shard under state/, so one user's
+# toggles never rewrite, lock or replay anyone else's state.
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, dev server only
+    fcntl = None  # type: ignore[assignment]
+
+State = Dict[str, Dict[str, Any]]
+Update = Tuple[str, Dict[str, bool]]  # (webcastId, {"watched": bool, ...})
+
+STATE_FLAGS = ("watched", "favorite")
+
+# Whose state a request without a user name reads and writes
+DEFAULT_USER = "default"
+
+# Lowercased; used as-is in shard file names
+USER_NAME_RE = re.compile(r"[a-z0-9][a-z0-9._@-]{0,63}")
+
+# Fold the journal into the snapshot once it gets this big
+DEFAULT_COMPACT_BYTES = 256 * 1024
+
+# StateStores UserStateStores keeps around; the least recently used one is
+# dropped (it holds no state, only paths) and made again when needed
+MAX_OPEN_STORES = 256
+
+
+def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def fsync_dir(path: str) -> None:
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: str, payload: Any, **dump_kwargs: Any) -> None:
+    """
+    Write JSON to a temp file, fsync it, then rename over `path`.
+    Readers see either the old or the new file, never a partial one.
+    """
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, **dump_kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """atomic_write_json for an already-serialized payload."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+class FileLock:
+    """flock() on `path` (shared or exclusive) for the duration of a with block."""
+
+    def __init__(self, path: str, exclusive: bool) -> None:
+        self._path = path
+        self._exclusive = exclusive
+        self._fh: Any = None
+
+    def __enter__(self) -> "FileLock":
+        if fcntl is not None:
+            self._fh = open(self._path, "a+")
+            fcntl.flock(
+                self._fh.fileno(), fcntl.LOCK_EX if self._exclusive else fcntl.LOCK_SH
+            )
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._fh is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+
+def read_snapshot(path: str) -> State:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            state = json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+    # Backward compat: if file has top-level "webcast_state", unwrap it
+    if isinstance(state, dict) and isinstance(state.get("webcast_state"), dict):
+        return state["webcast_state"]
+
+    if isinstance(state, dict):
+        return state
+
+    return {}
+
+
+def normalize_user(name: Optional[str]) -> str:
+    """
+    The user name a store is kept under: lowercased, DEFAULT_USER if
+    empty. Raises ValueError for names that can't be a file name.
+    """
+    name = (name or "").strip().lower()
+    if not name:
+        return DEFAULT_USER
+    if not USER_NAME_RE.fullmatch(name):
+        raise ValueError(
+            "Invalid user name (up to 64 letters, digits, '.', '_', '@' or '-')"
+        )
+    return name
+
+
+def apply_updates(state: State, updates: Iterable[Update]) -> None:
+    for webcast_id, flags in updates:
+        st = state.setdefault(webcast_id, {})
+        for flag in STATE_FLAGS:
+            if flag in flags:
+                st[flag] = bool(flags[flag])
+
+
+class StateStore:
+    def __init__(
+        self,
+        snapshot_path: str,
+        journal_path: Optional[str] = None,
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+    ) -> None:
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or f"{snapshot_path}.journal.jsonl"
+        self.lock_path = f"{snapshot_path}.lock"
+        self.compact_bytes = compact_bytes
+
+    def signature(self) -> Tuple[Any, Any]:
+        """Changes whenever the snapshot or the journal changes."""
+        return (_signature(self.snapshot_path), _signature(self.journal_path))
+
+    def _replay_journal(self, state: State) -> None:
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write from a crash mid-append: only that line is
+                    # lost, apply() starts the next batch on a new line
+                    continue
+                webcast_id = entry.get("webcastId")
+                if webcast_id is None:
+                    continue
+                apply_updates(state, [(str(webcast_id), entry)])
+
+    def load(self) -> State:
+        if self.signature() == (None, None):
+            # Never written (e.g. a user who hasn't toggled anything yet):
+            # don't leave a lock file behind for every name that's read
+            return {}
+        with FileLock(self.lock_path, exclusive=False):
+            state = read_snapshot(self.snapshot_path)
+            self._replay_journal(state)
+        return state
+
+    def apply(self, updates: Iterable[Update]) -> None:
+        """Append deltas to the journal (one fsync per batch)."""
+        lines = []
+        for webcast_id, flags in updates:
+            entry: Dict[str, Any] = {"webcastId": webcast_id}
+            entry.update({k: bool(flags[k]) for k in STATE_FLAGS if k in flags})
+            lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+        if not lines:
+            return
+
+        with FileLock(self.lock_path, exclusive=True):
+            with open(self.journal_path, "a+b") as f:
+                # A crash mid-append leaves a line without its newline: end
+                # it first, or this batch would be glued onto it and lost too
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        lines.insert(0, "\n")
+                f.write("".join(lines).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                journal_size = f.tell()
+            if journal_size >= self.compact_bytes:
+                self._compact_locked()
+
+    def replace(self, state: State) -> None:
+        """Overwrite the whole state (snapshot) and drop the journal."""
+        with FileLock(self.lock_path, exclusive=True):
+            atomic_write_json(self.snapshot_path, state, indent=2)
+            self._truncate_journal()
+
+    def compact(self) -> None:
+        with FileLock(self.lock_path, exclusive=True):
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        state = read_snapshot(self.snapshot_path)
+        self._replay_journal(state)
+        atomic_write_json(self.snapshot_path, state, indent=2)
+        # Deltas are absolute values, so a reader that saw the new snapshot
+        # and the old journal still ends up with the same state.
+        self._truncate_journal()
+
+    def _truncate_journal(self) -> None:
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class UserStateStores:
+    """
+    One StateStore per user. DEFAULT_USER is `default`, the original
+    state.json and journal; anyone else gets <directory>/<user>.json and
+    <directory>/<user>.journal.jsonl, created on their first toggle.
+    """
+
+    def __init__(
+        self,
+        default: StateStore,
+        directory: str,
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+    ) -> None:
+        self.default = default
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self._stores: "OrderedDict[str, StateStore]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def store(self, user: str) -> StateStore:
+        """The store of a normalize_user() name."""
+        if user == DEFAULT_USER:
+            return self.default
+        with self._lock:
+            store = self._stores.get(user)
+            if store is None:
+                store = StateStore(
+                    os.path.join(self.directory, f"{user}.json"),
+                    os.path.join(self.directory, f"{user}.journal.jsonl"),
+                    self.compact_bytes,
+                )
+                self._stores[user] = store
+                if len(self._stores) > MAX_OPEN_STORES:
+                    self._stores.popitem(last=False)
+            else:
+                self._stores.move_to_end(user)
+            return store
+
+    def writable_store(self, user: str) -> StateStore:
+        """store(), with the shard directory created for its lock file."""
+        if user != DEFAULT_USER:
+            os.makedirs(self.directory, exist_ok=True)
+        return self.store(user)
+
+    def users(self) -> List[str]:
+        """DEFAULT_USER plus everyone with a shard on disk."""
+        users = {DEFAULT_USER}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            for suffix in (".journal.jsonl", ".json"):
+                if name.endswith(suffix):
+                    user = name[: -len(suffix)]
+                    if USER_NAME_RE.fullmatch(user):
+                        users.add(user)
+                    break
+        return sorted(users)